@@ -1,5 +1,6 @@
 # app/advanced_recommender.py
 
+import numpy as np
 import pandas as pd
 from surprise import Dataset, Reader, SVD
 
@@ -66,4 +67,34 @@ def get_collaborative_filtering_recommendations(user_id: str, products_df: pd.Da
     recommended_product_ids = [pred.iid for pred in predictions[:top_n]]
 
     print(f"DEBUG: Collaborative filtering recommends: {recommended_product_ids}")
-    return recommended_product_ids
\ No newline at end of file
+    return recommended_product_ids
+
+def score_collaborative_batch(user_ids, product_ids) -> np.ndarray:
+    """
+    Vectorised equivalent of COLLAB_MODEL.predict for a block of users against a
+    list of products. Returns a (len(user_ids), len(product_ids)) array of
+    estimated ratings, using the same baseline fallbacks Surprise uses for
+    unknown users or items.
+    """
+    scores = np.zeros((len(user_ids), len(product_ids)), dtype=np.float32)
+    if COLLAB_MODEL is None:
+        print("WARN: Collaborative model not trained yet. Skipping.")
+        return scores
+
+    algo = COLLAB_MODEL
+    trainset = algo.trainset
+    inner_uids = np.array([trainset._raw2inner_id_users.get(uid, -1) for uid in user_ids])
+    inner_iids = np.array([trainset._raw2inner_id_items.get(pid, -1) for pid in product_ids])
+    known_u = inner_uids >= 0
+    known_i = inner_iids >= 0
+
+    scores += trainset.global_mean
+    if algo.biased:
+        scores[known_u] += algo.bu[inner_uids[known_u]][:, None]
+        scores[:, known_i] += algo.bi[inner_iids[known_i]][None, :]
+    if known_u.any() and known_i.any():
+        dot = algo.pu[inner_uids[known_u]] @ algo.qi[inner_iids[known_i]].T
+        scores[np.ix_(known_u, known_i)] += dot
+
+    low, high = trainset.rating_scale
+    return np.clip(scores, low, high)
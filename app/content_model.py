@@ -0,0 +1,197 @@
+# app/content_model.py
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# --- Configuration ---
+# Vectors are cached on disk keyed by a hash of the product text, so a product
+# is only re-embedded when its name, category or description changes.
+CONTENT_CACHE_PATH = os.getenv(
+    "CONTENT_CACHE_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.cache', 'content_vectors.npz'))
+)
+N_FEATURES = 2 ** 14
+
+# Same weighting the collaborative model uses to turn interactions into "ratings"
+INTERACTION_STRENGTH = {
+    'view': 1.0,
+    'add_to_cart': 2.0,
+    'purchase': 3.0,
+}
+
+# Created on first use so importing this module does not pull in scikit-learn
+VECTORIZER = None
+
+# This global variable will hold our fitted content model in memory
+CONTENT_MODEL = None
+
+
+class ContentModel:
+    """
+    Item text vectors plus per-user profile vectors, all row-aligned so that
+    similarity for a block of users is a single sparse matrix product.
+    """
+    def __init__(self, product_ids, item_vectors, user_ids, user_profiles):
+        self.product_ids = np.asarray(product_ids)
+        self.product_index = {pid: i for i, pid in enumerate(self.product_ids)}
+        self.item_vectors = item_vectors        # (n_products, N_FEATURES), l2-normalised
+        self.user_ids = np.asarray(user_ids)
+        self.user_index = {uid: i for i, uid in enumerate(self.user_ids)}
+        self.user_profiles = user_profiles      # (n_users, N_FEATURES), l2-normalised
+
+    def score_users(self, user_ids) -> np.ndarray:
+        """
+        Returns a dense (len(user_ids), n_products) cosine-similarity matrix.
+        Users without a profile get a row of zeros.
+        """
+        rows = [self.user_index.get(uid, -1) for uid in user_ids]
+        scores = np.zeros((len(rows), len(self.product_ids)), dtype=np.float32)
+        known = [i for i, r in enumerate(rows) if r >= 0]
+        if known:
+            profiles = self.user_profiles[[rows[i] for i in known]]
+            scores[known] = (profiles @ self.item_vectors.T).toarray()
+        return scores
+
+
+def get_vectorizer():
+    """
+    HashingVectorizer is stateless, so a product's vector does not depend on the
+    rest of the catalogue and can safely be cached per product.
+    """
+    global VECTORIZER
+    if VECTORIZER is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        VECTORIZER = HashingVectorizer(
+            n_features=N_FEATURES,
+            ngram_range=(1, 2),
+            stop_words='english',
+            alternate_sign=False,
+            norm='l2',
+        )
+    return VECTORIZER
+
+
+def _l2_normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+def product_text(product: dict) -> str:
+    """The text that represents a product for similarity purposes."""
+    return f"{product.get('name', '')} {product.get('category', '')} {product.get('description', '')}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _load_vector_cache(cache_path: str):
+    """
+    Loads the on-disk cache. Returns ({content_hash: row}, matrix), or ({}, None)
+    when there is no usable cache.
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return {}, None
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            if int(cached['n_features']) != N_FEATURES:
+                print("WARN: Content vector cache was built with a different feature size. Rebuilding.")
+                return {}, None
+            hashes = cached['hashes'].tolist()
+            matrix = sparse.csr_matrix(
+                (cached['data'], cached['indices'], cached['indptr']),
+                shape=(len(hashes), N_FEATURES),
+            )
+        return {h: i for i, h in enumerate(hashes)}, matrix
+    except Exception as e:
+        print(f"WARN: Could not read content vector cache at {cache_path}: {e}")
+        return {}, None
+
+
+def _save_vector_cache(cache_path: str, hashes: list, matrix: sparse.csr_matrix):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            hashes=np.asarray(hashes),
+            data=matrix.data,
+            indices=matrix.indices,
+            indptr=matrix.indptr,
+            n_features=N_FEATURES,
+        )
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"WARN: Could not write content vector cache to {cache_path}: {e}")
+
+
+def embed_products(products_df: pd.DataFrame, cache_path: str = CONTENT_CACHE_PATH) -> sparse.csr_matrix:
+    """
+    Returns an l2-normalised sparse matrix with one row per product in products_df.
+    Only products whose text hash is missing from the on-disk cache are vectorised.
+    """
+    texts = [product_text(p) for p in products_df.to_dict('records')]
+    hashes = [content_hash(t) for t in texts]
+    if not hashes:
+        return sparse.csr_matrix((0, N_FEATURES), dtype=np.float64)
+
+    cache_index, cache_matrix = _load_vector_cache(cache_path)
+    unique_hashes = list(dict.fromkeys(hashes))
+    missing = [h for h in unique_hashes if h not in cache_index]
+    print(f"INFO: Content vectors: {len(unique_hashes) - len(missing)} cached, {len(missing)} newly embedded.")
+
+    if missing:
+        text_by_hash = dict(zip(hashes, texts))
+        new_vectors = get_vectorizer().transform([text_by_hash[h] for h in missing]).tocsr()
+        # Rebuild the cache for the current catalogue only, so it does not grow forever
+        kept = [h for h in unique_hashes if h in cache_index]
+        blocks = [cache_matrix[[cache_index[h] for h in kept]]] if kept else []
+        cache_matrix = sparse.vstack(blocks + [new_vectors]).tocsr()
+        cache_index = {h: i for i, h in enumerate(kept + missing)}
+        _save_vector_cache(cache_path, kept + missing, cache_matrix)
+
+    return cache_matrix[[cache_index[h] for h in hashes]].tocsr()
+
+
+def _interaction_matrix(interactions_df: pd.DataFrame, user_ids, product_index: dict) -> sparse.csr_matrix:
+    """Builds a (n_users, n_products) matrix of summed interaction strengths."""
+    user_index = {uid: i for i, uid in enumerate(user_ids)}
+    if interactions_df is None or interactions_df.empty:
+        return sparse.csr_matrix((len(user_ids), len(product_index)), dtype=np.float64)
+
+    weights = interactions_df['type'].map(INTERACTION_STRENGTH)
+    rows = interactions_df['user_id'].map(user_index)
+    cols = interactions_df['product_id'].map(product_index)
+    valid = weights.notna() & rows.notna() & cols.notna()
+
+    return sparse.csr_matrix(
+        (weights[valid].to_numpy(dtype=np.float64),
+         (rows[valid].to_numpy(dtype=np.int64), cols[valid].to_numpy(dtype=np.int64))),
+        shape=(len(user_ids), len(product_index)),
+    )  # duplicate (user, product) pairs are summed on construction
+
+
+def train_content_model(products_df: pd.DataFrame, interactions_df: pd.DataFrame, cache_path: str = CONTENT_CACHE_PATH) -> ContentModel:
+    """
+    Embeds product text (reusing cached vectors) and builds a profile vector
+    for every user as the interaction-weighted sum of the items they touched.
+    """
+    global CONTENT_MODEL
+    print("INFO: Starting content model training...")
+
+    product_ids = products_df['product_id'].to_numpy() if not products_df.empty else np.array([])
+    product_index = {pid: i for i, pid in enumerate(product_ids)}
+    item_vectors = embed_products(products_df, cache_path=cache_path)
+
+    user_ids = interactions_df['user_id'].unique() if not interactions_df.empty else np.array([])
+    weights = _interaction_matrix(interactions_df, user_ids, product_index)
+    user_profiles = _l2_normalize_rows(weights @ item_vectors)
+
+    CONTENT_MODEL = ContentModel(product_ids, item_vectors, user_ids, user_profiles)
+    print(f"INFO: Content model trained for {len(user_ids)} users and {len(product_ids)} products.")
+    return CONTENT_MODEL
+
@@ -2,7 +2,6 @@
 
 import os
 import pandas as pd
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
 # --- Configuration ---
@@ -21,6 +20,8 @@ def load_data():
 
     client = None  # Initialize client to None
     try:
+        # Imported here so processes that start from a snapshot never load pymongo
+        from pymongo import MongoClient
         print("INFO: Connecting to MongoDB...")
         client = MongoClient(MDB_URI)
         db = client[DB_NAME]
@@ -59,4 +60,39 @@ def load_data():
     finally:
         if client:
             client.close()
-            print("INFO: MongoDB connection closed.")
\ No newline at end of file
+            print("INFO: MongoDB connection closed.")
+
+# --- Local Snapshot ---
+# A pickled copy of the last successful load, so processes can start without
+# waiting on MongoDB. Only ever read back from files this process wrote.
+SNAPSHOT_PATH = os.getenv(
+    "DATA_SNAPSHOT_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.cache', 'data_snapshot.pkl'))
+)
+
+def load_snapshot(path: str = SNAPSHOT_PATH):
+    """
+    Loads the products, users and interactions DataFrames from the local
+    snapshot. Returns None if there is no usable snapshot.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = pd.read_pickle(path)
+        print(f"INFO: Loaded data snapshot from {path}.")
+        return snapshot['products'], snapshot['users'], snapshot['interactions']
+    except Exception as e:
+        print(f"WARN: Could not read data snapshot at {path}: {e}")
+        return None
+
+def save_snapshot(products_df: pd.DataFrame, users_df: pd.DataFrame, interactions_df: pd.DataFrame, path: str = SNAPSHOT_PATH):
+    """Writes the DataFrames to the local snapshot (atomically, via a temp file)."""
+    if products_df.empty or users_df.empty:
+        return  # Never replace a good snapshot with a failed load
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        pd.to_pickle({'products': products_df, 'users': users_df, 'interactions': interactions_df}, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"WARN: Could not write data snapshot to {path}: {e}")
@@ -1,7 +1,13 @@
 # app/main.py
 import json
 import redis
-from fastapi import FastAPI, HTTPException
+import time
+import asyncio
+import threading
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List
 import os
 import sys
@@ -9,11 +15,19 @@ import sys
 # Add parent directory to the path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.models import RecommendedProduct
-from app.data_loader import load_data
+from app.models import Product, RecommendedProduct, InteractionEvent
+from app.data_loader import load_data, load_snapshot, save_snapshot
 # We only need explanation and social proof generators now
 #from app.recommender import get_content_based_recommendations
-from app.recommender import generate_explanation, generate_social_proof
+from app.recommender import generate_explanations_batch, generate_social_proof, is_fallback_explanation
+from app.online_fallback import OnlineFallback
+from app.recommendation_store import (
+    RANKED_DEPTH, read_user_recommendations, record_interaction, paginate, recent_items_by_user
+)
+from app.response_cache import ResponseCache, RECOMMENDATIONS_VERSION_KEY
+from app.metrics import (
+    REQUEST_LATENCY, ERRORS, start_trace, trace_stage, observe_stage, current_trace, record_cache_lookup, render_metrics
+)
 #from app.advanced_recommender import train_collaborative_model, get_collaborative_filtering_recommendations
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -33,86 +47,492 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Records request latency per route. Send `?profile=1` or an `X-Profile: 1`
+    header to get per-stage timings back in a Server-Timing response header.
+    """
+    profile = request.query_params.get('profile') in ('1', 'true') or request.headers.get('x-profile') == '1'
+    start = time.perf_counter()
+    status = 500
+    with start_trace(enabled=profile) as trace:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Use the route template, not the raw path, to keep label cardinality bounded
+            route = request.scope.get('route')
+            REQUEST_LATENCY.labels(
+                method=request.method,
+                route=getattr(route, 'path', 'unmatched'),
+                status=str(status),
+            ).observe(time.perf_counter() - start)
+        if trace is not None:
+            response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
 # --- Global DataFrames & Model ---
-# These are defined globally as None first. The startup event will populate them.
+# These are defined globally as None first. The warm-up thread will populate them.
 # These are still needed for fast lookups of product details
 PRODUCTS_DF, USERS_DF, INTERACTIONS_DF = None, None, None
+USER_IDS = frozenset() # Known user IDs, for the constant-time 404 check
+PRODUCT_IDS = frozenset() # Catalogue product IDs, to validate reported interactions
 redis_client = None
+ONLINE_FALLBACK = None # Computes recommendations for users the batch job has not covered yet
+FALLBACK_BUDGET_SECONDS = float(os.getenv("FALLBACK_BUDGET_MS", "50")) / 1000
+FALLBACK_TOP_N = RANKED_DEPTH # Same depth the batch job pre-computes
+RECENT_ITEMS = {} # user_id -> product IDs in their most recent interactions as of the last data load
 
-@app.on_event("startup")
-def startup_event():
-    """
-    On startup, load data into memory and connect to Redis.
-    The model training is no longer done here.
-    """
-    global PRODUCTS_DF, USERS_DF, INTERACTIONS_DF, redis_client
-    print("INFO: Application startup: Loading data and and connecting to cache...")
-    
-    # Load data into the global DataFrames
-    PRODUCTS_DF, USERS_DF, INTERACTIONS_DF = load_data()
-    
+# --- In-process Response Cache ---
+RESPONSE_CACHE = ResponseCache(
+    'response',
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+)
+# LLM explanations generated by the API, keyed by (user_id, product IDs), so
+# concurrent JSON and streaming requests for the same page share one LLM call
+EXPLANATION_CACHE = ResponseCache(
+    'generated_explanation',
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+)
+# user_id -> number of interactions reported for them. Part of the response cache
+# key, so responses computed before an interaction (even ones still in flight)
+# are never served after it.
+INTERACTION_GENERATION = {}
+VERSION_CHECK_SECONDS = 1.0 # How often to poll Redis for a newly published recommendations version
+_VERSION_POLLER = None # Background task started on startup
+
+# --- Warm-up State ---
+# Reported by /health/ready. Data is loaded on a background thread so the
+# server can accept (and answer health checks for) requests immediately.
+WARMUP_STATE = {
+    'status': 'starting', # starting -> loading -> ready | failed
+    'data_source': None,  # 'snapshot' or 'mongodb' once data is loaded
+    'refreshing': False,  # True while fresher data is loaded behind a snapshot
+    'ready_after_seconds': None,
+    'error': None,
+}
+_PROCESS_START = time.perf_counter()
+_EVENT_LOOP = None
+
+def install_data(products_df, users_df, interactions_df, source: str):
+    """Swaps in a new set of DataFrames, and everything derived from them, for serving."""
+    global PRODUCTS_DF, USERS_DF, INTERACTIONS_DF, ONLINE_FALLBACK, RECENT_ITEMS, USER_IDS, PRODUCT_IDS
+    online_fallback = None
+    recent_items = recent_items_by_user(interactions_df)
+    user_ids = frozenset(users_df['user_id']) if not users_df.empty else frozenset()
+    product_ids = frozenset(products_df['product_id']) if not products_df.empty else frozenset()
+    if not products_df.empty:
+        # Build derived structures before the swap so requests never see a half-built state
+        online_fallback = OnlineFallback(
+            products_df, interactions_df, redis_client,
+            top_n=FALLBACK_TOP_N, budget_seconds=FALLBACK_BUDGET_SECONDS,
+        )
+    previous_fallback = ONLINE_FALLBACK
+    PRODUCTS_DF, USERS_DF, INTERACTIONS_DF, ONLINE_FALLBACK = products_df, users_df, interactions_df, online_fallback
+    RECENT_ITEMS, USER_IDS, PRODUCT_IDS = recent_items, user_ids, product_ids
+    if previous_fallback is not None:
+        previous_fallback.shutdown()
+
+    # Responses built from the previous data are stale; clear on the event loop that owns the cache
+    for cache in (RESPONSE_CACHE, EXPLANATION_CACHE):
+        if _EVENT_LOOP is not None:
+            _EVENT_LOOP.call_soon_threadsafe(cache.clear)
+        else:
+            cache.clear()
+
+    if WARMUP_STATE['status'] != 'ready':
+        WARMUP_STATE['ready_after_seconds'] = round(time.perf_counter() - _PROCESS_START, 3)
+    WARMUP_STATE.update(status='ready', data_source=source, error=None)
+    print(f"INFO: Serving data from {source} ({len(products_df)} products, {len(users_df)} users).")
+
+def connect_redis():
+    global redis_client
     try:
-        redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        redis_client = redis.Redis(
+            host='localhost', port=6379, db=0, decode_responses=True,
+            socket_connect_timeout=2, socket_timeout=2,
+        )
         redis_client.ping()
         print("INFO: Successfully connected to Redis cache.")
     except redis.exceptions.ConnectionError as e:
         print(f"WARN: Could not connect to Redis. Caching is disabled. {e}")
+        ERRORS.labels(component='redis').inc()
         redis_client = None
 
+def warm_up():
+    """
+    Connects to Redis, then loads data in the background: the local snapshot
+    first (fast), then a fresh copy from MongoDB, which also refreshes the snapshot.
+    """
+    WARMUP_STATE['status'] = 'loading'
+    try:
+        connect_redis()
+        snapshot = load_snapshot()
+        if snapshot is not None:
+            install_data(*snapshot, source='snapshot')
+
+        WARMUP_STATE['refreshing'] = True
+        products_df, users_df, interactions_df = load_data()
+        WARMUP_STATE['refreshing'] = False
+        if not products_df.empty and not users_df.empty:
+            install_data(products_df, users_df, interactions_df, source='mongodb')
+            save_snapshot(products_df, users_df, interactions_df)
+        elif WARMUP_STATE['status'] != 'ready':
+            WARMUP_STATE.update(status='failed', error="Could not load data from MongoDB and no snapshot is available.")
+            ERRORS.labels(component='data_load').inc()
+    except Exception as e:
+        # Without this the thread would die silently and leave the status at 'loading'
+        print(f"ERROR: Warm-up failed. {e}")
+        ERRORS.labels(component='warm_up').inc()
+        WARMUP_STATE.update(refreshing=False, error=str(e))
+        if WARMUP_STATE['status'] != 'ready':
+            WARMUP_STATE['status'] = 'failed'
+        # Otherwise keep serving the snapshot; `error` reports the failed refresh
+
+@app.on_event("startup")
+async def startup_event():
+    """
+    On startup, start connecting to Redis and loading data in the background.
+    Nothing blocking happens here, so the server is accepting requests right away;
+    /health/ready reports when data is loaded.
+    """
+    global _EVENT_LOOP, _VERSION_POLLER
+    print("INFO: Application startup: connecting to cache and loading data in the background...")
+    _EVENT_LOOP = asyncio.get_running_loop()
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+    _VERSION_POLLER = asyncio.ensure_future(poll_recommendations_version())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _VERSION_POLLER is not None:
+        _VERSION_POLLER.cancel()
+
 # --- API Endpoints ---
 @app.get("/", tags=["Health Check"])
 async def root():
     """Simple health check to ensure the server is running."""
     return {"message": "Recommender API is running! Access /docs for documentation."}
 
+@app.get("/health/live", tags=["Health Check"])
+async def liveness():
+    """Liveness probe: the process is up and serving HTTP."""
+    return {"status": "alive", "uptime_seconds": round(time.perf_counter() - _PROCESS_START, 3)}
+
+@app.get("/health/ready", tags=["Health Check"])
+async def readiness():
+    """
+    Readiness probe: 200 once data is loaded and Redis is connected; 503 while
+    warming up, if loading failed, or without Redis (every recommendation
+    endpoint would answer 503).
+    """
+    body = {**WARMUP_STATE, 'redis_connected': redis_client is not None}
+    status_code = 200 if WARMUP_STATE['status'] == 'ready' and redis_client is not None else 503
+    return JSONResponse(content=body, status_code=status_code)
+
+@app.get("/metrics", tags=["Health Check"], include_in_schema=False)
+def metrics():
+    """Exposes Prometheus metrics for scraping."""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 @app.get(
     "/recommendations/{user_id}", 
     response_model=List[RecommendedProduct], 
     tags=["Recommendations"]
 )
 
-async def get_hybrid_recommendations_for_user(user_id: str, top_n: int = 5):
+async def get_hybrid_recommendations_for_user(
+    user_id: str,
+    top_n: int = Query(5, ge=1, le=RANKED_DEPTH),
+    offset: int = Query(0, ge=0, lt=RANKED_DEPTH),
+):
     """
     Retrieves pre-computed recommendations from the Redis cache for a user.
-    This endpoint is now extremely fast.
+    Use `offset` and `top_n` to page through the ranked list.
+    Full responses are cached in-process per (user_id, top_n, offset, recommendations version),
+    and concurrent identical requests share one computation.
     """
 
+    if WARMUP_STATE['status'] != 'ready':
+        raise HTTPException(status_code=503, detail="Service is warming up. Check /health/ready.")
+
     if redis_client is None:
         raise HTTPException(status_code=503, detail="Caching service is unavailable.")
     
-    if user_id not in USERS_DF['user_id'].values:
+
+    if user_id not in USER_IDS:
         raise HTTPException(status_code=404, detail=f"User ID '{user_id}' not found.")
-    
-    # 1. Fetch pre-computed product IDs from the Redis cache.
-    redis_key = f"user:{user_id}:recommendations"
-    cached_ids_json = redis_client.get(redis_key)
 
-    if not cached_ids_json:
-        # A "cache miss" means no recommendations were pre-computed for this user.
-        return[]
-    
-    recommended_ids = json.loads(cached_ids_json)
+    recommendations, _ = await RESPONSE_CACHE.get_or_compute(
+        response_cache_key(user_id, top_n, offset),
+        lambda: build_recommendations(user_id, top_n, offset),
+        should_cache=lambda result: result[1],
+    )
+    return recommendations
+
+@app.post("/interactions", status_code=202, tags=["Interactions"])
+async def record_user_interaction(event: InteractionEvent):
+    """
+    Reports an interaction (view, add_to_cart or purchase) as it happens, so
+    the item stops being recommended to the user straight away instead of
+    after the API's next data load. The interaction itself is still stored in
+    MongoDB by the shop; this only tells the recommender about it.
+    """
+    if WARMUP_STATE['status'] != 'ready':
+        raise HTTPException(status_code=503, detail="Service is warming up. Check /health/ready.")
+
+    if redis_client is None:
+        raise HTTPException(status_code=503, detail="Caching service is unavailable.")
+
+    if event.user_id not in USER_IDS:
+        raise HTTPException(status_code=404, detail=f"User ID '{event.user_id}' not found.")
+
+    if event.product_id not in PRODUCT_IDS:
+        raise HTTPException(status_code=404, detail=f"Product ID '{event.product_id}' not found.")
+
+    timestamp = (event.timestamp or datetime.now()).timestamp()
+    redis_pipe = redis_client.pipeline(transaction=False)
+    record_interaction(redis_pipe, event.user_id, event.product_id, timestamp)
+    with trace_stage('redis_set'):
+        await run_in_threadpool(redis_pipe.execute)
+    # Cached and in-flight responses may still contain the item: move the user to new cache keys
+    INTERACTION_GENERATION[event.user_id] = INTERACTION_GENERATION.get(event.user_id, 0) + 1
+    return {'status': 'recorded'}
+
+def response_cache_key(user_id: str, top_n: int, offset: int) -> tuple:
+    """RESPONSE_CACHE key for one page of a user's recommendations."""
+    return (user_id, INTERACTION_GENERATION.get(user_id, 0), top_n, offset)
+
+async def poll_recommendations_version():
+    """
+    Background task: every VERSION_CHECK_SECONDS, reads the version published
+    by the batch job (off the event loop) and drops cached responses when it
+    changes. Requests never wait on Redis before checking the in-process cache.
+    """
+    while True:
+        if redis_client is not None:
+            try:
+                with trace_stage('version_check'):
+                    version = await run_in_threadpool(redis_client.get, RECOMMENDATIONS_VERSION_KEY)
+                RESPONSE_CACHE.set_version(version)
+                EXPLANATION_CACHE.set_version(version)
+            except Exception as e:
+                print(f"WARN: Could not read the recommendations version from Redis. {e}")
+                ERRORS.labels(component='redis').inc()
+        await asyncio.sleep(VERSION_CHECK_SECONDS)
+
+def resolve_recommended_products(user_id: str, top_n: int, offset: int = 0) -> tuple:
+    """
+    Returns (products, personalized): one page of the user's ranked recommended
+    products (as dicts) from Redis or the online fallback, skipping items they
+    interacted with recently. personalized is False when generic bestsellers
+    were served in place of the user's own list.
+    """
+    # 1. Fetch pre-computed product IDs (best first) from the Redis cache, along
+    # with interactions reported to the API since the data was loaded.
+    with trace_stage('redis_get'):
+        recommended_ids, reported_recent_ids = read_user_recommendations(redis_client, user_id)
+    record_cache_lookup('redis', hit=bool(recommended_ids))
+
+    personalized = True
+    if not recommended_ids:
+        if ONLINE_FALLBACK is None:
+            return [], False
+        # A "cache miss" means no recommendations were pre-computed for this user
+        # (e.g. they signed up after the last batch run), so compute them now.
+        recommended_ids, personalized = ONLINE_FALLBACK.recommend(user_id)
+
+    # Drop items viewed, added to cart or bought recently, then take the requested page
+    recent_ids = RECENT_ITEMS.get(user_id, frozenset()) | reported_recent_ids
+    recommended_ids = paginate(recommended_ids, recent_ids, offset, top_n)
+    if not recommended_ids:
+        return [], personalized
 
     # 2. Fetch full product details from our in-memory DataFrame
-    results_df = PRODUCTS_DF[PRODUCTS_DF['product_id'].isin(recommended_ids)]
+    with trace_stage('hydrate'):
+        results_df = PRODUCTS_DF[PRODUCTS_DF['product_id'].isin(recommended_ids)]
 
-    # Preserve the ranked order from Redis
-    results_df = results_df.set_index('product_id').loc[recommended_ids].reset_index()
+        # Preserve the ranked order from Redis, skipping products no longer in the catalogue
+        results_df = results_df.drop_duplicates('product_id').set_index('product_id')
+        recommended_ids = [pid for pid in recommended_ids if pid in results_df.index]
+        results_df = results_df.loc[recommended_ids].reset_index()
+    return results_df.to_dict('records'), personalized
 
-    # 3. Generate explanations and social proofs(fast enough to do on-the-fly)
-    final_recommendations = []
-    for _, product_row in results_df.iterrows():
-        product_dict = product_row.to_dict()
+def get_cached_explanations(user_id: str) -> dict:
+    """Explanations pre-computed by the batch job, as {product_id: explanation}."""
+    with trace_stage('explanation_cache_get'):
+        cached = redis_client.hgetall(f"user:{user_id}:explanations") or {}
+    # Placeholders written by older batch runs are not explanations; generate those again
+    return {pid: text for pid, text in cached.items() if not is_fallback_explanation(text)}
 
-        explanation = generate_explanation(product_dict, user_id, PRODUCTS_DF, INTERACTIONS_DF)
-        social_proof = generate_social_proof(product_dict['product_id'], INTERACTIONS_DF)
+async def generate_missing_explanations(user_id: str, missing_products: list) -> dict:
+    """
+    Generates explanations for products the batch job did not cover, with one
+    batched LLM call, as {product_id: explanation}. Requests for the same user
+    and products share the call; results containing placeholders are not cached.
+    """
+    product_ids = tuple(p['product_id'] for p in missing_products)
+
+    def generate():
+        with trace_stage('explanation'):
+            generated = generate_explanations_batch({user_id: missing_products}, PRODUCTS_DF, INTERACTIONS_DF)
+        return {pid: text for (_, pid), text in generated.items()}
+
+    # The LLM call is blocking, so run it off the event loop
+    return await EXPLANATION_CACHE.get_or_compute(
+        (user_id, product_ids),
+        lambda: run_in_threadpool(generate),
+        should_cache=lambda explanations: not any(is_fallback_explanation(t) for t in explanations.values()),
+    )
 
-        rec_product = RecommendedProduct(
+def get_social_proofs(products: list) -> dict:
+    """Social proof text for each product, as {product_id: social_proof}."""
+    social_proofs = {}
+    for product_dict in products:
+        with trace_stage('social_proof'):
+            social_proofs[product_dict['product_id']] = generate_social_proof(product_dict['product_id'], INTERACTIONS_DF)
+    return social_proofs
+
+def assemble_recommendations(products: list, explanations: dict, social_proofs: dict, personalized: bool) -> tuple:
+    """
+    Combines products, explanations and social proofs into the response.
+    Returns (recommendations, cacheable); degraded responses are not cacheable.
+    """
+    final_recommendations = [
+        RecommendedProduct(
             **product_dict,
-            explanation=explanation,
-            social_proof=social_proof
+            explanation=explanations[product_dict['product_id']],
+            social_proof=social_proofs[product_dict['product_id']],
         )
-        final_recommendations.append(rec_product)
+        for product_dict in products
+    ]
+    # Responses with placeholder explanations are served but not cached, so the LLM is retried
+    cacheable = personalized and not any(is_fallback_explanation(r.explanation) for r in final_recommendations)
+    return final_recommendations, cacheable
+
+async def build_recommendations(user_id: str, top_n: int, offset: int = 0) -> tuple:
+    """
+    Builds the full response for a user from Redis and the in-memory DataFrames.
+    Returns (recommendations, cacheable). The blocking steps (Redis, pandas)
+    run off the event loop.
+    """
+    products, personalized = await run_in_threadpool(resolve_recommended_products, user_id, top_n, offset)
+    if not products:
+        return [], personalized
+
+    # 3. Explanations: use any pre-computed by the batch job, and generate the
+    # rest with a single batched LLM call instead of one call per product.
+    explanations = await run_in_threadpool(get_cached_explanations, user_id)
+    missing_products = [p for p in products if p['product_id'] not in explanations]
+    record_cache_lookup('explanation', hit=not missing_products)
+    if missing_products:
+        explanations.update(await generate_missing_explanations(user_id, missing_products))
+
+    # 4. Social proofs (fast enough to do on-the-fly)
+    social_proofs = await run_in_threadpool(get_social_proofs, products)
+    return assemble_recommendations(products, explanations, social_proofs, personalized)
+
+# --- Streaming ---
+def _sse(event: str, data) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _done_event(count: int, started: float) -> str:
+    """
+    Records the stream's full duration as the `stream_total` stage and formats
+    the final `done` event. The request histogram and Server-Timing header stop
+    when the headers are sent, so profiled streams get their per-stage timings
+    in this event instead.
+    """
+    observe_stage('stream_total', time.perf_counter() - started)
+    data = {'count': count}
+    trace = current_trace()
+    if trace is not None:
+        data['server_timing'] = trace.server_timing()
+    return _sse('done', data)
+
+@app.get("/recommendations/{user_id}/stream", tags=["Recommendations"])
+async def stream_recommendations_for_user(
+    user_id: str,
+    top_n: int = Query(5, ge=1, le=RANKED_DEPTH),
+    offset: int = Query(0, ge=0, lt=RANKED_DEPTH),
+):
+    """
+    Streams recommendations as Server-Sent Events so clients can render
+    progressively: a `product` event per card as soon as the ranked list is
+    known, `explanation` events for explanations the batch job pre-computed,
+    a `social_proof` event per card, then the generated `explanation` events
+    and finally `done` (or `error`). Generated explanations come from one
+    batched LLM call, so they arrive together after the social proofs.
+    """
+    if WARMUP_STATE['status'] != 'ready':
+        raise HTTPException(status_code=503, detail="Service is warming up. Check /health/ready.")
+
+    if redis_client is None:
+        raise HTTPException(status_code=503, detail="Caching service is unavailable.")
+
+    if user_id not in USER_IDS:
+        raise HTTPException(status_code=404, detail=f"User ID '{user_id}' not found.")
+
+    return StreamingResponse(
+        recommendation_events(user_id, top_n, offset),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+async def recommendation_events(user_id: str, top_n: int, offset: int = 0):
+    """
+    Async generator behind the streaming endpoint. The finished response is
+    stored in RESPONSE_CACHE, so later JSON or streaming requests reuse it.
+    """
+    started = time.perf_counter()
+    try:
+        # A complete response is already cached: send it all at once
+        cache_key, version = response_cache_key(user_id, top_n, offset), RESPONSE_CACHE.version
+        cached = RESPONSE_CACHE.peek(cache_key)
+        if cached is not None:
+            cached_response, _ = cached
+            for rec in cached_response:
+                yield _sse('product', rec.model_dump())
+            yield _done_event(len(cached_response), started)
+            return
+
+        products, personalized = await run_in_threadpool(resolve_recommended_products, user_id, top_n, offset)
+        for product_dict in products:
+            yield _sse('product', Product(**product_dict).model_dump())
+
+        explanations = await run_in_threadpool(get_cached_explanations, user_id)
+        for product_dict in products:
+            if product_dict['product_id'] in explanations:
+                yield _sse('explanation', {'product_id': product_dict['product_id'], 'explanation': explanations[product_dict['product_id']]})
+
+        # Start the (slow) LLM call now and stream social proofs while it runs
+        missing_products = [p for p in products if p['product_id'] not in explanations]
+        record_cache_lookup('explanation', hit=not missing_products)
+        explanation_task = None
+        if missing_products:
+            explanation_task = asyncio.ensure_future(generate_missing_explanations(user_id, missing_products))
+
+        social_proofs = {}
+        for product_dict in products:
+            social_proof = await run_in_threadpool(generate_social_proof, product_dict['product_id'], INTERACTIONS_DF)
+            social_proofs[product_dict['product_id']] = social_proof
+            yield _sse('social_proof', {'product_id': product_dict['product_id'], 'social_proof': social_proof})
+
+        if explanation_task is not None:
+            generated = await explanation_task
+            explanations.update(generated)
+            for pid, text in generated.items():
+                yield _sse('explanation', {'product_id': pid, 'explanation': text})
 
-    return final_recommendations 
-   
\ No newline at end of file
+        response = assemble_recommendations(products, explanations, social_proofs, personalized)
+        if response[1]:
+            RESPONSE_CACHE.store(cache_key, response, version)
+        yield _done_event(len(products), started)
+    except Exception as e:
+        print(f"ERROR: Streaming recommendations failed for user {user_id}. {e}")
+        ERRORS.labels(component='stream').inc()
+        yield _sse('error', {'detail': "Could not compute recommendations."})
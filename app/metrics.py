@@ -0,0 +1,144 @@
+# app/metrics.py
+
+import time
+import contextvars
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+
+# --- Metric Definitions ---
+# Buckets tuned for an API whose fast path is sub-millisecond and whose slow path is an LLM call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    'recommender_request_seconds', 'End-to-end HTTP request latency.',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    'recommender_stage_seconds', 'Latency of each recommendation pipeline stage.',
+    ['stage'], buckets=LATENCY_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    'recommender_llm_seconds', 'Latency of LLM explanation calls.',
+    ['outcome'], buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'recommender_cache_requests_total', 'Cache lookups by cache and result (hit/miss).',
+    ['cache', 'result'],
+)
+ERRORS = Counter(
+    'recommender_errors_total', 'Errors by component.',
+    ['component'],
+)
+FALLBACKS = Counter(
+    'recommender_fallbacks_total', 'Times a degraded fallback response was served.',
+    ['reason'],
+)
+
+# The batch job's metrics live in their own registry: the job exits before
+# Prometheus would scrape it, so they are pushed to a Pushgateway at the end
+# of each run, and the API's /metrics does not report them.
+BATCH_REGISTRY = CollectorRegistry()
+BATCH_USERS = Counter(
+    'recommender_batch_users_total', 'Users processed by the batch job.',
+    registry=BATCH_REGISTRY,
+)
+BATCH_DURATION = Gauge(
+    'recommender_batch_last_duration_seconds', 'Wall time of the last batch job run.',
+    registry=BATCH_REGISTRY,
+)
+BATCH_THROUGHPUT = Gauge(
+    'recommender_batch_last_users_per_second', 'Users per second of the last batch job run.',
+    registry=BATCH_REGISTRY,
+)
+BATCH_LAST_SUCCESS = Gauge(
+    'recommender_batch_last_success_timestamp_seconds', 'Unix time the last successful batch job run finished.',
+    registry=BATCH_REGISTRY,
+)
+
+
+# --- Tracing ---
+# Holds the Trace for the current request, if profiling was requested for it
+_CURRENT_TRACE = contextvars.ContextVar('recommender_trace', default=None)
+
+
+class Trace:
+    """Collects per-stage timings for a single request."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []  # list of (stage, seconds), in completion order
+
+    def add(self, stage: str, seconds: float):
+        self.stages.append((stage, seconds))
+
+    def totals(self) -> dict:
+        """Seconds per stage, summed over repeated stages (e.g. one explanation per product)."""
+        totals = {}
+        for stage, seconds in self.stages:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def server_timing(self) -> str:
+        """Formats the trace as a Server-Timing header value (durations in ms)."""
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.totals().items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def start_trace(enabled: bool = True):
+    """
+    Activates a Trace for the enclosed code. Stage timings are always recorded
+    in the histograms; the Trace only exists when profiling is enabled.
+    """
+    if not enabled:
+        yield None
+        return
+    trace = Trace()
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+
+
+def current_trace():
+    """The Trace for the current request, or None if profiling was not requested."""
+    return _CURRENT_TRACE.get()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Records a stage timing measured by the caller."""
+    STAGE_LATENCY.labels(stage=stage).observe(seconds)
+    trace = _CURRENT_TRACE.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def trace_stage(stage: str):
+    """Times the enclosed block as a pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def push_batch_metrics(gateway: str, job: str = 'recommender_batch'):
+    """Pushes the batch job's metrics to a Prometheus Pushgateway (e.g. "localhost:9091")."""
+    from prometheus_client import push_to_gateway
+    try:
+        push_to_gateway(gateway, job=job, registry=BATCH_REGISTRY)
+        print(f"INFO: Pushed batch metrics to {gateway}.")
+    except Exception as e:
+        print(f"WARN: Could not push batch metrics to {gateway}. {e}")
+        ERRORS.labels(component='metrics_push').inc()
+
+
+def render_metrics():
+    """Returns (payload, content_type) in the Prometheus text exposition format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
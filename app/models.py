@@ -28,4 +28,12 @@ class Interaction(BaseModel):
 class RecommendedProduct(Product):
     """Extends the Product model to include the LLM-generated explanation."""
     explanation: str
-    social_proof: Optional[str] = None
\ No newline at end of file
+    social_proof: Optional[str] = None
+
+# --- API Request Model (Used by main.py) ---
+class InteractionEvent(BaseModel):
+    """An interaction reported to the API as it happens."""
+    user_id: str
+    product_id: str
+    type: Literal['view', 'purchase', 'add_to_cart']
+    timestamp: Optional[datetime] = None # Defaults to the time it is received
@@ -0,0 +1,110 @@
+# app/online_fallback.py
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+import pandas as pd
+
+from app.ranking import RankingPipeline
+from app.metrics import ERRORS, FALLBACKS, trace_stage
+from app.recommendation_store import list_key
+
+# --- Configuration ---
+# Only cheap, in-memory signals; 'content' and 'svd' contribute only if those
+# models happen to be loaded in this process and are otherwise ignored.
+FALLBACK_WEIGHTS = {
+    'category': 0.5,
+    'popularity': 0.3,
+    'content': 0.1,
+    'svd': 0.1,
+}
+FALLBACK_TTL_SECONDS = 6 * 60 * 60  # Written-back results expire so the next batch run takes over
+
+
+class OnlineFallback:
+    """
+    Computes recommendations on the fly for users the batch job has not covered.
+
+    Each miss is computed on a small worker pool. The caller waits at most
+    budget_seconds; if the computation is slower it gets the global bestsellers
+    instead, and the computation finishes in the background. Finished results
+    are written back to Redis asynchronously.
+
+    Stampede protection: concurrent misses for the same user share one
+    computation, and when too many computations are queued new misses are
+    served the bestsellers without queueing more work.
+    """
+    def __init__(self, products_df: pd.DataFrame, interactions_df: pd.DataFrame, redis_client,
+                 top_n: int = 10, budget_seconds: float = 0.05, max_workers: int = 4, max_pending: int = 64):
+        self.pipeline = RankingPipeline(products_df, interactions_df, weights=FALLBACK_WEIGHTS)
+        self.redis_client = redis_client
+        self.top_n = top_n
+        self.budget_seconds = budget_seconds
+        self.max_pending = max_pending
+        bestsellers = np.argsort(-self.pipeline.popularity, kind='stable')[:top_n]
+        self.popular_ids = self.pipeline.product_ids[bestsellers].tolist()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='online-fallback')
+        self._inflight = {}  # user_id -> Future
+        self._lock = threading.Lock()
+
+    def recommend(self, user_id: str) -> tuple:
+        """
+        Returns (product_ids, personalized) for user_id within the latency budget.
+        personalized is False when the bestsellers were served instead (over
+        budget, overloaded or failed), so callers should not cache the result.
+        """
+        submitted = False
+        with self._lock:
+            future = self._inflight.get(user_id)
+            if future is None:
+                if len(self._inflight) >= self.max_pending:
+                    FALLBACKS.labels(reason='online_overloaded').inc()
+                    return list(self.popular_ids), False
+                future = self._executor.submit(self._compute, user_id)
+                self._inflight[user_id] = future
+                submitted = True
+        if submitted:
+            # Registered outside the lock: if the computation has already
+            # finished, the callback runs right here and takes the lock itself.
+            future.add_done_callback(lambda f, uid=user_id: self._on_done(uid, f))
+
+        try:
+            with trace_stage('online_fallback'):
+                return list(future.result(timeout=self.budget_seconds)), True
+        except FutureTimeoutError:
+            FALLBACKS.labels(reason='online_over_budget').inc()
+            return list(self.popular_ids), False
+        except Exception as e:
+            print(f"ERROR: Online fallback failed for user {user_id}. {e}")
+            ERRORS.labels(component='online_fallback').inc()
+            return list(self.popular_ids), False
+
+    def _compute(self, user_id: str) -> list:
+        ranked = self.pipeline.rank([user_id], top_n=self.top_n)[0]
+        FALLBACKS.labels(reason='online_computed').inc()
+        return [pid for pid, _ in ranked] or list(self.popular_ids)
+
+    def _on_done(self, user_id: str, future):
+        # Usually runs on the worker thread after the result is set, so waiting
+        # requests are released before the Redis write happens. If the result
+        # was ready before the callback was registered, runs on the caller's thread.
+        with self._lock:
+            self._inflight.pop(user_id, None)
+        if future.cancelled() or future.exception() is not None or self.redis_client is None:
+            return
+        try:
+            # nx=True: keep the first result. The API reads the batch job's scored
+            # set before this list, so a later batch run takes over regardless.
+            self.redis_client.set(
+                list_key(user_id), json.dumps(future.result()),
+                ex=FALLBACK_TTL_SECONDS, nx=True,
+            )
+        except Exception as e:
+            print(f"WARN: Could not write online fallback recommendations for user {user_id} to Redis. {e}")
+            ERRORS.labels(component='redis').inc()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,194 @@
+# app/profiling.py
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+from io import StringIO
+from datetime import datetime, timezone
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; fall back to the stdlib where possible
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _current_rss_bytes():
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss
+    return None
+
+
+def _peak_rss_bytes():
+    """Process-lifetime peak RSS as reported by the OS, if available."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux but bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    if psutil is not None and hasattr(psutil.Process().memory_info(), 'peak_wset'):
+        return psutil.Process().memory_info().peak_wset  # Windows
+    return None
+
+
+class BatchProfiler:
+    """
+    Records per-phase wall/CPU time, per-block and per-user latency and memory
+    high-water marks for the batch job, and writes them out as a JSON report.
+    When disabled every method is a cheap no-op so the job can always call it.
+
+    Users are scored in blocks, so the block latency says nothing about
+    individual users. For the per-user distribution a few users from each
+    block are sampled and scored again one at a time.
+    """
+    def __init__(self, enabled: bool = False, use_cprofile: bool = False, top_functions: int = 25,
+                 users_sampled_per_block: int = 8, seed: int = 0):
+        self.enabled = enabled
+        self.use_cprofile = enabled and use_cprofile
+        self.top_functions = top_functions
+        self.users_sampled_per_block = users_sampled_per_block
+        self.phases = {}        # name -> {'wall_seconds', 'cpu_seconds', 'calls', 'rss_after_bytes'}
+        self.block_latencies = []  # seconds per scored block
+        self.block_sizes = []
+        self.user_latencies = []   # seconds per sampled user, scored on their own
+        self.counters = {}
+        self._rng = np.random.default_rng(seed)
+        self.rss_high_water = 0
+        self._cprofile = cProfile.Profile() if self.use_cprofile else None
+        self._started_wall = None
+        self._started_cpu = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._sample_memory()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+    def _sample_memory(self):
+        rss = _current_rss_bytes()
+        if rss is not None:
+            self.rss_high_water = max(self.rss_high_water, rss)
+        return rss
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the enclosed block. Repeated phases (e.g. once per block) are accumulated."""
+        if not self.enabled:
+            yield
+            return
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            stats = self.phases.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            stats['wall_seconds'] += time.perf_counter() - wall_start
+            stats['cpu_seconds'] += time.process_time() - cpu_start
+            stats['calls'] += 1
+            stats['rss_after_bytes'] = self._sample_memory()
+
+    def record_block(self, n_users: int, seconds: float):
+        """Records the latency of scoring one block of n_users users."""
+        if self.enabled and n_users:
+            self.block_latencies.append(seconds)
+            self.block_sizes.append(n_users)
+
+    def sample_users(self, user_ids) -> list:
+        """Picks the users of a block to score again one at a time (none when disabled)."""
+        if not self.enabled or len(user_ids) == 0:
+            return []
+        k = min(self.users_sampled_per_block, len(user_ids))
+        return self._rng.choice(np.asarray(user_ids), size=k, replace=False).tolist()
+
+    def record_user(self, seconds: float):
+        """Records the latency of scoring one sampled user on their own."""
+        if self.enabled:
+            self.user_latencies.append(seconds)
+
+    def count(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @staticmethod
+    def _latency_summary(samples: list) -> dict:
+        if not samples:
+            return {'count': 0}
+        latencies = np.asarray(samples)
+        p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+        return {
+            'count': int(latencies.size),
+            'mean_ms': float(latencies.mean() * 1000),
+            'p50_ms': float(p50 * 1000),
+            'p90_ms': float(p90 * 1000),
+            'p95_ms': float(p95 * 1000),
+            'p99_ms': float(p99 * 1000),
+            'max_ms': float(latencies.max() * 1000),
+        }
+
+    def _hot_functions(self) -> list:
+        if self._cprofile is None:
+            return []
+        stats = pstats.Stats(self._cprofile, stream=StringIO())
+        rows = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f"{os.path.basename(filename)}:{line}({func})",
+                'calls': ncalls,
+                'self_seconds': tottime,
+                'cumulative_seconds': cumtime,
+            })
+        rows.sort(key=lambda r: r['cumulative_seconds'], reverse=True)
+        return rows[:self.top_functions]
+
+    def report(self) -> dict:
+        total_wall = time.perf_counter() - self._started_wall if self._started_wall else 0.0
+        total_cpu = time.process_time() - self._started_cpu if self._started_cpu else 0.0
+        self._sample_memory()
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_wall_seconds': total_wall,
+            'total_cpu_seconds': total_cpu,
+            'phases': self.phases,
+            'per_block_latency': {
+                **self._latency_summary(self.block_latencies),
+                'mean_users_per_block': float(np.mean(self.block_sizes)) if self.block_sizes else 0.0,
+            },
+            'per_user_latency': self._latency_summary(self.user_latencies),
+            'counters': self.counters,
+            'memory': {
+                'rss_high_water_bytes': self.rss_high_water or None,
+                'peak_rss_bytes': _peak_rss_bytes(),
+            },
+            'hot_functions': self._hot_functions(),
+        }
+
+    def write_report(self, path: str, cprofile_path: str = None) -> dict:
+        """Writes the JSON report (and optionally the raw cProfile stats) and returns the report."""
+        self.stop()
+        report = self.report()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        if self._cprofile is not None and cprofile_path:
+            self._cprofile.dump_stats(cprofile_path)
+        return report
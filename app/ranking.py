@@ -0,0 +1,253 @@
+# app/ranking.py
+
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.content_model import INTERACTION_STRENGTH
+
+# --- Configuration ---
+# Relative weight of each candidate generator in the fused score
+DEFAULT_WEIGHTS = {
+    'content': 0.5,
+    'svd': 0.3,
+    'popularity': 0.2,
+}
+RRF_K = 60  # Standard reciprocal-rank-fusion damping constant
+
+
+# --- Candidate Generators ---
+# Each generator takes the pipeline and a block of user IDs and returns a
+# (n_users, n_products) float array of scores, aligned to pipeline.product_ids.
+# NaN means "no opinion" for that item and is ignored during fusion.
+
+def content_candidates(pipeline, user_ids) -> np.ndarray:
+    from app import content_model
+    model = content_model.CONTENT_MODEL
+    if model is None:
+        return np.full((len(user_ids), len(pipeline.product_ids)), np.nan, dtype=np.float32)
+    scores = model.score_users(user_ids)
+    # Re-align in case the content model was trained on a different product order
+    cols = np.array([model.product_index.get(pid, -1) for pid in pipeline.product_ids])
+    aligned = np.full((len(user_ids), len(cols)), np.nan, dtype=np.float32)
+    aligned[:, cols >= 0] = scores[:, cols[cols >= 0]]
+    return aligned
+
+
+def svd_candidates(pipeline, user_ids) -> np.ndarray:
+    # Look the module up instead of importing it: it requires Surprise, and if
+    # nothing has imported it no SVD model can have been trained.
+    advanced_recommender = sys.modules.get('app.advanced_recommender')
+    if advanced_recommender is None or advanced_recommender.COLLAB_MODEL is None:
+        return np.full((len(user_ids), len(pipeline.product_ids)), np.nan, dtype=np.float32)
+    return advanced_recommender.score_collaborative_batch(user_ids, pipeline.product_ids)
+
+
+def popularity_candidates(pipeline, user_ids) -> np.ndarray:
+    return np.broadcast_to(pipeline.popularity, (len(user_ids), len(pipeline.product_ids))).copy()
+
+
+def category_candidates(pipeline, user_ids) -> np.ndarray:
+    """Scores each item by how strongly the user has engaged with its category."""
+    scores = np.full((len(user_ids), len(pipeline.product_ids)), np.nan, dtype=np.float32)
+    for i, uid in enumerate(user_ids):
+        row = pipeline.user_index.get(uid)
+        if row is not None:
+            scores[i] = pipeline.category_affinity[row, pipeline.category_codes]
+    return scores
+
+
+CANDIDATE_GENERATORS = {
+    'content': content_candidates,
+    'svd': svd_candidates,
+    'popularity': popularity_candidates,
+    'category': category_candidates,
+}
+
+
+# --- Score Normalization ---
+def normalize_scores(scores: np.ndarray, method: str = 'minmax') -> np.ndarray:
+    """
+    Normalises each user's row independently so generators on different scales
+    can be combined. Rows with no spread (no signal) become NaN.
+    """
+    scores = scores.astype(np.float32, copy=True)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows
+        if method == 'minmax':
+            low = np.nanmin(scores, axis=1, keepdims=True)
+            spread = np.nanmax(scores, axis=1, keepdims=True) - low
+            normalized = (scores - low) / spread
+        elif method == 'zscore':
+            spread = np.nanstd(scores, axis=1, keepdims=True)
+            normalized = (scores - np.nanmean(scores, axis=1, keepdims=True)) / spread
+        else:
+            raise ValueError(f"Unknown normalization method '{method}'.")
+    normalized[~(spread > 0).ravel()] = np.nan
+    return normalized
+
+
+def _rank_matrix(scores: np.ndarray) -> np.ndarray:
+    """0-based descending rank of every item per row; NaNs are ranked last."""
+    order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(scores.shape[1])[None, :], axis=1)
+    return ranks
+
+
+# --- Score Fusion ---
+def weighted_fusion(score_blocks: dict, weights: dict) -> np.ndarray:
+    fused = None
+    for name, scores in score_blocks.items():
+        contribution = weights[name] * np.nan_to_num(scores, nan=0.0)
+        fused = contribution if fused is None else fused + contribution
+    return fused
+
+
+def reciprocal_rank_fusion(score_blocks: dict, weights: dict, k: int = RRF_K) -> np.ndarray:
+    fused = None
+    for name, scores in score_blocks.items():
+        contribution = weights[name] / (k + 1 + _rank_matrix(scores))
+        contribution[np.isnan(scores)] = 0.0
+        fused = contribution if fused is None else fused + contribution
+    return fused
+
+
+FUSION_METHODS = {
+    'weighted': weighted_fusion,
+    'rrf': reciprocal_rank_fusion,
+}
+
+
+class RankingPipeline:
+    """
+    Candidate generation -> normalization -> fusion -> business filters, run on
+    blocks of users at once. Build one per data snapshot and reuse it from the
+    batch job or an online endpoint.
+    """
+    def __init__(self, products_df: pd.DataFrame, interactions_df: pd.DataFrame,
+                 weights: dict = None, fusion: str = 'weighted', normalization: str = 'minmax'):
+        self.weights = {name: w for name, w in (weights or DEFAULT_WEIGHTS).items() if w}
+        unknown = set(self.weights) - set(CANDIDATE_GENERATORS)
+        if unknown:
+            raise ValueError(f"Unknown candidate generators: {sorted(unknown)}")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}'.")
+        self.fusion = fusion
+        self.normalization = normalization
+
+        self.products_df = products_df.reset_index(drop=True)
+        self.product_ids = self.products_df['product_id'].to_numpy()
+        self.product_index = {pid: i for i, pid in enumerate(self.product_ids)}
+        self.prices = self.products_df['price'].to_numpy(dtype=np.float64) if 'price' in self.products_df else None
+        self.in_stock = self._stock_mask(self.products_df)
+        if 'category' in self.products_df:
+            self.category_codes, categories = pd.factorize(self.products_df['category'], use_na_sentinel=False)
+        else:
+            self.category_codes, categories = np.zeros(len(self.product_ids), dtype=np.int64), [None]
+        self.n_categories = len(categories)
+
+        # Per-user interaction masks, built once so filters are a row gather per block
+        self.user_index = {}
+        self.purchased = sparse.csr_matrix((0, len(self.product_ids)), dtype=bool)
+        self.interacted = self.purchased
+        self.popularity = np.zeros(len(self.product_ids), dtype=np.float32)
+        self.category_affinity = np.zeros((0, self.n_categories), dtype=np.float32)
+        if interactions_df is not None and not interactions_df.empty:
+            self._index_interactions(interactions_df)
+
+    @staticmethod
+    def _stock_mask(products_df: pd.DataFrame):
+        if 'in_stock' in products_df:
+            return products_df['in_stock'].fillna(False).to_numpy(dtype=bool)
+        if 'stock' in products_df:
+            return (products_df['stock'].fillna(0) > 0).to_numpy()
+        return None  # Catalogue has no stock information; nothing to filter
+
+    def _index_interactions(self, interactions_df: pd.DataFrame):
+        user_ids = interactions_df['user_id'].unique()
+        self.user_index = {uid: i for i, uid in enumerate(user_ids)}
+        rows = interactions_df['user_id'].map(self.user_index)
+        cols = interactions_df['product_id'].map(self.product_index)
+        valid = cols.notna()
+        rows = rows[valid].to_numpy(dtype=np.int64)
+        cols = cols[valid].to_numpy(dtype=np.int64)
+        is_purchase = (interactions_df['type'][valid] == 'purchase').to_numpy()
+        shape = (len(user_ids), len(self.product_ids))
+
+        self.interacted = sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=shape)
+        self.purchased = sparse.csr_matrix(
+            (np.ones(is_purchase.sum(), dtype=bool), (rows[is_purchase], cols[is_purchase])), shape=shape
+        )
+        strength = interactions_df['type'][valid].map(INTERACTION_STRENGTH).fillna(0).to_numpy()
+        self.popularity = np.log1p(np.bincount(cols, weights=strength, minlength=len(self.product_ids))).astype(np.float32)
+
+        # Interaction-weighted share of each user's activity per category
+        affinity = np.zeros((len(user_ids), max(self.n_categories, 1)), dtype=np.float32)
+        np.add.at(affinity, (rows, self.category_codes[cols]), strength)
+        totals = affinity.sum(axis=1, keepdims=True)
+        self.category_affinity = np.divide(affinity, totals, out=np.zeros_like(affinity), where=totals > 0)
+
+    def _user_mask(self, matrix: sparse.csr_matrix, user_ids) -> np.ndarray:
+        mask = np.zeros((len(user_ids), len(self.product_ids)), dtype=bool)
+        for i, uid in enumerate(user_ids):
+            row = self.user_index.get(uid)
+            if row is not None:
+                mask[i, matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]] = True
+        return mask
+
+    def score(self, user_ids, min_price: float = None, max_price: float = None,
+              exclude_purchased: bool = True, exclude_seen: bool = False,
+              in_stock_only: bool = True) -> np.ndarray:
+        """
+        Returns the fused (n_users, n_products) score array with filtered-out
+        items set to -inf.
+        """
+        user_ids = list(user_ids)
+        score_blocks = {
+            name: normalize_scores(CANDIDATE_GENERATORS[name](self, user_ids), self.normalization)
+            for name in self.weights
+        }
+        fused = FUSION_METHODS[self.fusion](score_blocks, self.weights)
+        if fused is None:
+            fused = np.zeros((len(user_ids), len(self.product_ids)), dtype=np.float32)
+
+        # --- Business filters ---
+        item_ok = np.ones(len(self.product_ids), dtype=bool)
+        if in_stock_only and self.in_stock is not None:
+            item_ok &= self.in_stock
+        if self.prices is not None:
+            if min_price is not None:
+                item_ok &= self.prices >= min_price
+            if max_price is not None:
+                item_ok &= self.prices <= max_price
+        fused[:, ~item_ok] = -np.inf
+        if exclude_seen:
+            fused[self._user_mask(self.interacted, user_ids)] = -np.inf
+        elif exclude_purchased:
+            fused[self._user_mask(self.purchased, user_ids)] = -np.inf
+        return fused
+
+    def rank(self, user_ids, top_n: int = 10, **filters) -> list:
+        """
+        Returns, for each user, a list of (product_id, score) tuples in ranked
+        order. Accepts the same filter keyword arguments as score().
+        """
+        scores = self.score(user_ids, **filters)
+        k = min(top_n, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for idx_row, score_row in zip(top, top_scores):
+            keep = np.isfinite(score_row)
+            results.append(list(zip(self.product_ids[idx_row[keep]].tolist(), score_row[keep].tolist())))
+        return results
@@ -0,0 +1,102 @@
+# app/recommendation_store.py
+
+import os
+import json
+
+import pandas as pd
+
+# --- Configuration ---
+# Scored candidates stored per user: enough for a few pages plus what the
+# serve-time filter removes, without re-running the batch job.
+RANKED_DEPTH = int(os.getenv("RANKED_DEPTH", "100"))
+# Items in a user's most recent interactions are never served, even if they
+# happened after the batch job ranked them.
+RECENT_INTERACTIONS_LIMIT = int(os.getenv("RECENT_INTERACTIONS_LIMIT", "20"))
+# How long Redis keeps interactions reported to the API; long enough to bridge
+# the gap until the API's next data load includes them.
+RECENT_INTERACTIONS_TTL_SECONDS = int(os.getenv("RECENT_INTERACTIONS_TTL_SECONDS", str(24 * 60 * 60)))
+
+
+def ranked_key(user_id: str) -> str:
+    """Sorted set of product_id -> fused score, written by the batch job."""
+    return f"user:{user_id}:ranked"
+
+
+def list_key(user_id: str) -> str:
+    """JSON list of product IDs, written by the online fallback (and by older batch runs)."""
+    return f"user:{user_id}:recommendations"
+
+
+def recent_key(user_id: str) -> str:
+    """Sorted set of product_id -> timestamp of the user's latest interactions, written by the API."""
+    return f"user:{user_id}:recent"
+
+
+def write_ranked(redis_pipe, user_id: str, ranked: list, ttl_seconds: int = None):
+    """
+    Queues, on a Redis pipeline, a replacement of the user's scored candidates
+    with `ranked` ([(product_id, score), ...]). The new set is built under a
+    temporary key and renamed into place, so readers never see it half written.
+    """
+    key = ranked_key(user_id)
+    if not ranked:
+        redis_pipe.delete(key)
+        return
+    staging_key = f"{key}:next"
+    redis_pipe.delete(staging_key)
+    redis_pipe.zadd(staging_key, dict(ranked))
+    if ttl_seconds:
+        redis_pipe.expire(staging_key, ttl_seconds)
+    redis_pipe.rename(staging_key, key)
+
+
+def record_interaction(redis_pipe, user_id: str, product_id: str, timestamp: float,
+                       limit: int = RECENT_INTERACTIONS_LIMIT, ttl_seconds: int = RECENT_INTERACTIONS_TTL_SECONDS):
+    """
+    Queues, on a Redis pipeline, the addition of product_id (interacted with
+    at `timestamp`, in epoch seconds) to the user's recent interactions,
+    keeping only the `limit` most recent.
+    """
+    if limit <= 0:
+        return
+    key = recent_key(user_id)
+    redis_pipe.zadd(key, {product_id: timestamp})
+    redis_pipe.zremrangebyrank(key, 0, -limit - 1)
+    redis_pipe.expire(key, ttl_seconds)
+
+
+def read_user_recommendations(redis_client, user_id: str) -> tuple:
+    """
+    Returns (product_ids, recent_ids) in one round trip: the user's stored
+    product IDs, best first, from the scored set or else the JSON list (None
+    if neither exists), and the set of product IDs in the interactions
+    recently reported to the API.
+    """
+    redis_pipe = redis_client.pipeline(transaction=False)
+    redis_pipe.zrevrange(ranked_key(user_id), 0, -1)
+    redis_pipe.get(list_key(user_id))
+    redis_pipe.zrange(recent_key(user_id), 0, -1)
+    ranked_ids, ids_json, recent_ids = redis_pipe.execute()
+    recent_ids = frozenset(recent_ids)
+    if ranked_ids:
+        return ranked_ids, recent_ids
+    if ids_json:
+        return json.loads(ids_json), recent_ids
+    return None, recent_ids
+
+
+def paginate(product_ids: list, exclude, offset: int, top_n: int) -> list:
+    """Drops excluded IDs, then returns the page [offset, offset + top_n)."""
+    if exclude:
+        product_ids = [pid for pid in product_ids if pid not in exclude]
+    return product_ids[offset:offset + top_n]
+
+
+def recent_items_by_user(interactions_df: pd.DataFrame, limit: int = RECENT_INTERACTIONS_LIMIT) -> dict:
+    """Maps each user_id to the set of product IDs in their `limit` most recent interactions."""
+    if interactions_df.empty or limit <= 0:
+        return {}
+    if 'timestamp' in interactions_df.columns:
+        interactions_df = interactions_df.sort_values('timestamp', kind='stable')
+    recent = interactions_df.groupby('user_id', sort=False).tail(limit)
+    return recent.groupby('user_id', sort=False)['product_id'].agg(frozenset).to_dict()
@@ -2,45 +2,112 @@
 
 import pandas as pd
 import os
+import re
+import json
 from typing import List
-from google import genai
+import threading
 from dotenv import load_dotenv
 import sys
+import time
 
 # Add parent directory to path to allow imports from app/
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from app.metrics import LLM_LATENCY, ERRORS, FALLBACKS
+
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-try:
-    GENAI_CLIENT = genai.Client()
-    print("DEBUG: Gemini Client initialized successfully.")
-except Exception as e:
-    print(f"ERROR: Could not initialize Gemini Client. Check GEMINI_API_KEY in .env: {e}")
-    GENAI_CLIENT = None
+# The Gemini client (and the google-genai SDK itself) is created on first use,
+# so importing this module stays cheap for processes that never call the LLM.
+GENAI_CLIENT = None
+_GENAI_CLIENT_LOCK = threading.Lock()
+_GENAI_CLIENT_INITIALIZED = False
+
+def get_genai_client():
+    """Returns the shared Gemini client, creating it on first call (None if unavailable)."""
+    global GENAI_CLIENT, _GENAI_CLIENT_INITIALIZED
+    if _GENAI_CLIENT_INITIALIZED:
+        return GENAI_CLIENT
+    with _GENAI_CLIENT_LOCK:
+        if not _GENAI_CLIENT_INITIALIZED:
+            try:
+                from google import genai
+                GENAI_CLIENT = genai.Client()
+                print("DEBUG: Gemini Client initialized successfully.")
+            except Exception as e:
+                print(f"ERROR: Could not initialize Gemini Client. Check GEMINI_API_KEY in .env: {e}")
+                GENAI_CLIENT = None
+            _GENAI_CLIENT_INITIALIZED = True
+    return GENAI_CLIENT
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+EXPLANATION_UNAVAILABLE = "The AI recommendation explanation service is temporarily unavailable."
+EXPLANATION_UNCONFIGURED = "The AI Explanation service is temporarily unavailable. Check your API key."
+EXPLANATION_MAX_RETRIES = 2 # Extra attempts for items whose batched explanation failed validation
+EXPLANATION_MAX_CHARS = 600
+# Words the prompt tells the model never to use; an explanation containing them is
+# rejected, unless the product itself uses them (e.g. an "AI-powered camera")
+FORBIDDEN_EXPLANATION_WORDS = re.compile(r"\b(gemini|ai|algorithm)\b", re.IGNORECASE)
+
+EXPLANATION_INSTRUCTIONS = """
+        1. Write a single paragraph (Max 3 sentences).
+        2. Focus on connecting the product's category and description directly to the user's past interactions.
+        3. Be friendly and confident. Do not mention "Gemini", "AI", or "algorithm" unless the product's own name or description does.
+        4. Start the explanation directly, e.g., "Since you recently..." or "Because you love..."
+"""
+
+def set_genai_client(client):
+    """Replaces the shared LLM client, e.g. with a local stand-in for tests or load tests."""
+    global GENAI_CLIENT, _GENAI_CLIENT_INITIALIZED
+    with _GENAI_CLIENT_LOCK:
+        GENAI_CLIENT = client
+        _GENAI_CLIENT_INITIALIZED = True
+
+def _call_llm(prompt: str, client=None, json_output: bool = False) -> str:
+    """Sends a prompt to the LLM and returns the response text. Raises on failure."""
+    client = client or get_genai_client()
+    config = {"response_mime_type": "application/json"} if json_output else None
+    start = time.perf_counter()
+    try:
+        response = client.models.generate_content(model=GEMINI_MODEL, contents=prompt, config=config)
+        text = response.text.strip()
+    except Exception:
+        LLM_LATENCY.labels(outcome='error').observe(time.perf_counter() - start)
+        ERRORS.labels(component='llm').inc()
+        raise
+    LLM_LATENCY.labels(outcome='success').observe(time.perf_counter() - start)
+    return text
+
+def build_user_context(user_id: str, products_df: pd.DataFrame, interactions_df: pd.DataFrame) -> str:
+    """Summarises a user's behaviour (their top categories) for use in explanation prompts."""
+    user_interactions = interactions_df[interactions_df['user_id'] == user_id]
+    if user_interactions.empty:
+        return "This product is popular overall and we thought you might like it."
+
+    # Summarize user behaviour: list top categories purchased/viewed
+    category_by_product = products_df.drop_duplicates('product_id').set_index('product_id')['category']
+    top_categories_list = user_interactions['product_id'].map(category_by_product).dropna() \
+        .value_counts().head(3).index.to_list()
+    return f"User has previously interacted with items in categories such as : {', '.join(top_categories_list)}. The recommendation is based on category similarity."
+
+def _product_details(product: dict) -> str:
+    return f"Product Name: {product['name']}. Category: {product['category']}. Description: {product['description']}"
 
-def generate_explanation(recommended_product: dict, user_id: str, products_df: pd.DataFrame, interactions_df: pd.DataFrame) -> str:
+def generate_explanation(recommended_product: dict, user_id: str, products_df: pd.DataFrame, interactions_df: pd.DataFrame, client=None) -> str:
     """
     Uses Gemini to generate a personalized explanation for the recommendation.
     Now accepts products_df and interactions_df as arguments.
     """
-    if GENAI_CLIENT is None:
-        return "The AI Explanation service is temporarily unavailable. Check your API key."
+    if (client or get_genai_client()) is None:
+        FALLBACKS.labels(reason='llm_unconfigured').inc()
+        return EXPLANATION_UNCONFIGURED
     
     # 1. Get User Purchase/Interaction History Summary
-    user_interactions = interactions_df[interactions_df['user_id'] == user_id]
-    if user_interactions.empty:
-        user_context = "This product is popular overall and we thought you might like it."
-    else:
-        # Summarize user behaviour: list top categories purchased/viewed
-        top_categories_list = user_interactions['product_id'].map(
-            lambda pid: products_df[products_df['product_id'] == pid]['category'].iloc[0]
-        ).value_counts().head(3).index.to_list()
-        user_context = f"User has previously interacted with items in categories such as : {', '.join(top_categories_list)}. The recommendation is based on category similarity."
+    user_context = build_user_context(user_id, products_df, interactions_df)
 
     # 2. Define the product details
-    product_details = f"Product Name: {recommended_product['name']}. Category: {recommended_product['category']}. Description: {recommended_product['description']}"
+    product_details = _product_details(recommended_product)
 
     # 3. Create the prompt (Prompt Engineering)
     prompt = f"""
@@ -49,23 +116,130 @@ def generate_explanation(recommended_product: dict, user_id: str, products_df: p
         - {user_context}
         - Recommended Product: {product_details}
 
-        Instructions:
-        1. Write a single paragraph (Max 3 sentences).
-        2. Focus on connecting the product's category and description directly to the user's past interactions.
-        3. Be friendly and confident. Do not mention "Gemini", "AI", or "algorithm".
-        4. Start the explanation directly, e.g., "Since you recently..." or "Because you love..."
-    """
+        Instructions:{EXPLANATION_INSTRUCTIONS}"""
 
     # 4. Call the Gemini API
     try:
-        response = GENAI_CLIENT.generate_content(
-            model="models/gemini-pro", # Using a standard model name
-            prompt=prompt,
-        )
-        return response.text.strip()
+        return _call_llm(prompt, client=client)
     except Exception as e:
+        FALLBACKS.labels(reason='llm_error').inc()
         print(f"ERROR: Gemini API call failed for user {user_id}. {e}")
-        return "The AI recommendation explanation service is temporarily unavailable."
+        return EXPLANATION_UNAVAILABLE
+
+def build_batch_explanation_prompt(items_by_user: dict, contexts: dict) -> str:
+    """
+    Builds one prompt covering every (user, product) pair in items_by_user.
+    Each user's context and the shared instructions appear only once.
+    """
+    sections = []
+    for user_id, products in items_by_user.items():
+        product_lines = "\n".join(
+            f"          - product_id: {p['product_id']}. {_product_details(p)}" for p in products
+        )
+        sections.append(
+            f"        User {user_id}:\n        - Context: {contexts[user_id]}\n        - Recommended Products:\n{product_lines}"
+        )
+    users_block = "\n\n".join(sections)
+
+    return f"""
+        You are an expert e-commerce recommendation system. Your goal is to write a short, personalized, and persuasive explanation for each recommended product below.
+
+{users_block}
+
+        Instructions for every explanation:{EXPLANATION_INSTRUCTIONS}
+        Respond with JSON only, in exactly this format, with one entry per recommended product:
+        {{"explanations": [{{"user_id": "...", "product_id": "...", "explanation": "..."}}]}}
+"""
+
+def is_fallback_explanation(text) -> bool:
+    """True for the placeholder texts returned when no explanation could be generated."""
+    return text in (EXPLANATION_UNAVAILABLE, EXPLANATION_UNCONFIGURED)
+
+def _forbidden_words(text: str) -> set:
+    return {word.lower() for word in FORBIDDEN_EXPLANATION_WORDS.findall(text)}
+
+def _is_valid_explanation(text, product: dict = None) -> bool:
+    if not isinstance(text, str) or not 0 < len(text.strip()) <= EXPLANATION_MAX_CHARS:
+        return False
+    allowed = _forbidden_words(_product_details(product)) if product else set()
+    return _forbidden_words(text) <= allowed
+
+def parse_batch_explanations(response_text: str, expected_keys: set, products: dict = None) -> dict:
+    """
+    Parses the JSON response of a batched prompt into {(user_id, product_id): explanation}.
+    Entries that are malformed, unexpected or fail validation are left out.
+    products maps each key to its product dict, so explanations may quote the product.
+    """
+    text = response_text.strip()
+    if text.startswith("```"):
+        # Strip a markdown code fence such as ```json ... ```
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return {}
+
+    entries = payload.get("explanations") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return {}
+
+    explanations = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        key = (str(entry.get("user_id")), str(entry.get("product_id")))
+        explanation = entry.get("explanation")
+        product = products.get(key) if products else None
+        if key in expected_keys and key not in explanations and _is_valid_explanation(explanation, product):
+            explanations[key] = explanation.strip()
+    return explanations
+
+def generate_explanations_batch(items_by_user: dict, products_df: pd.DataFrame, interactions_df: pd.DataFrame, client=None, max_retries: int = EXPLANATION_MAX_RETRIES) -> dict:
+    """
+    Generates explanations for many products (and optionally many users) with a
+    single structured prompt instead of one request per product.
+
+    items_by_user maps user_id -> list of product dicts. Returns
+    {(user_id, product_id): explanation}. Items whose explanation is missing or
+    invalid are retried (only those items) up to max_retries times, then get
+    the standard "unavailable" message.
+    """
+    expected = {(user_id, p['product_id']) for user_id, products in items_by_user.items() for p in products}
+    if not expected:
+        return {}
+    if (client or get_genai_client()) is None:
+        FALLBACKS.labels(reason='llm_unconfigured').inc(len(expected))
+        return {key: EXPLANATION_UNCONFIGURED for key in expected}
+
+    contexts = {user_id: build_user_context(user_id, products_df, interactions_df) for user_id in items_by_user}
+    products_by_key = {(user_id, p['product_id']): p for user_id, products in items_by_user.items() for p in products}
+    explanations = {}
+    pending = items_by_user
+    for attempt in range(max_retries + 1):
+        prompt = build_batch_explanation_prompt(pending, contexts)
+        pending_keys = {(user_id, p['product_id']) for user_id, products in pending.items() for p in products}
+        try:
+            response_text = _call_llm(prompt, client=client, json_output=True)
+            explanations.update(parse_batch_explanations(response_text, pending_keys, products_by_key))
+        except Exception as e:
+            print(f"ERROR: Batched Gemini API call failed (attempt {attempt + 1}). {e}")
+
+        # Retry only the items that are still missing
+        pending = {
+            user_id: [p for p in products if (user_id, p['product_id']) not in explanations]
+            for user_id, products in pending.items()
+        }
+        pending = {user_id: products for user_id, products in pending.items() if products}
+        if not pending:
+            break
+
+    missing = expected - explanations.keys()
+    if missing:
+        FALLBACKS.labels(reason='llm_error').inc(len(missing))
+        for key in missing:
+            explanations[key] = EXPLANATION_UNAVAILABLE
+    return explanations
 
 def get_content_based_recommendations(user_id: str, products_df: pd.DataFrame, interactions_df: pd.DataFrame, top_n: int = 3) -> pd.DataFrame:
     """
@@ -0,0 +1,111 @@
+# app/response_cache.py
+
+import time
+import asyncio
+from collections import OrderedDict
+
+from app.metrics import record_cache_lookup
+
+# --- Configuration ---
+# Redis key the batch job bumps every time it publishes a new set of recommendations
+RECOMMENDATIONS_VERSION_KEY = "recommendations:version"
+
+
+class ResponseCache:
+    """
+    In-process TTL + LRU cache for API responses, with request coalescing:
+    concurrent requests for the same key share a single computation.
+
+    Entries belong to a version (e.g. the published recommendations version);
+    changing the version drops every entry so stale responses are never served.
+    Intended for use from a single event loop.
+    """
+    def __init__(self, name: str, ttl_seconds: float = 60.0, max_entries: int = 10_000):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._inflight = {}            # key -> asyncio.Future
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set_version(self, version):
+        """Switches to a new version, dropping all cached entries if it changed."""
+        if version != self.version:
+            self.version = version
+            self.clear()
+
+    def clear(self):
+        self._entries.clear()
+
+
+    def get(self, key):
+        """Returns the cached value or None if missing/expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def peek(self, key):
+        """Returns the value cached for key under the current version, without computing it."""
+        return self.get((self.version, key))
+
+    def store(self, key, value, version):
+        """
+        Caches a value computed outside get_or_compute (e.g. a streamed response)
+        for key, unless the version has moved on since the computation started.
+        """
+        if version == self.version:
+            self.put((version, key), value)
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key, compute, should_cache=None):
+        """
+        Returns the cached value for key, or awaits compute() to build it.
+        If a computation for the same key is already running, waits for that
+        one instead of starting another. Failures are not cached, and neither
+        are values for which should_cache(value) returns False (e.g. degraded
+        responses that should be retried on the next request).
+
+        The computation runs as its own task: a caller that is cancelled (e.g.
+        its client disconnected) stops waiting, but the shared work carries on
+        for everyone else coalesced onto it.
+        """
+        full_key = (self.version, key)
+        value = self.get(full_key)
+        if value is not None:
+            record_cache_lookup(self.name, hit=True)
+            return value
+
+        task = self._inflight.get(full_key)
+        if task is not None:
+            record_cache_lookup(self.name, hit=True)  # Coalesced onto a running computation
+        else:
+            record_cache_lookup(self.name, hit=False)
+            task = asyncio.ensure_future(self._compute_and_store(full_key, compute, should_cache))
+            # Mark the outcome retrieved so a failure nobody waited for does not log a warning
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[full_key] = task
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, full_key, compute, should_cache):
+        try:
+            value = await compute()
+        finally:
+            self._inflight.pop(full_key, None)
+        if should_cache is None or should_cache(value):
+            version, key = full_key
+            self.store(key, value, version)  # Skipped if the version moved on while we were computing
+        return value
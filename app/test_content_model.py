@@ -0,0 +1,104 @@
+# app/test_content_model.py
+
+import sys
+import os
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('sklearn')
+
+from app import content_model
+from app.content_model import embed_products, train_content_model, product_text, content_hash
+
+PRODUCTS_DF = pd.DataFrame([
+    {'product_id': 'P001', 'name': 'Cordless Drill', 'category': 'Tool', 'description': 'A powerful cordless drill.'},
+    {'product_id': 'P002', 'name': 'Hammer Drill', 'category': 'Tool', 'description': 'A heavy duty hammer drill.'},
+    {'product_id': 'P003', 'name': 'Mystery Novel', 'category': 'Book', 'description': 'A gripping detective story.'},
+])
+INTERACTIONS_DF = pd.DataFrame([
+    {'user_id': 'U001', 'product_id': 'P001', 'type': 'purchase'},
+    {'user_id': 'U002', 'product_id': 'P003', 'type': 'view'},
+])
+
+
+@pytest.fixture
+def embedded_texts(monkeypatch):
+    """Records every text that is actually vectorised (i.e. missed the cache)."""
+    texts = []
+    vectorizer = content_model.get_vectorizer()
+
+    class CountingVectorizer:
+        def transform(self, batch):
+            texts.extend(batch)
+            return vectorizer.transform(batch)
+    monkeypatch.setattr(content_model, 'get_vectorizer', lambda: CountingVectorizer())
+    return texts
+
+
+def _cached_hashes(cache_path):
+    with np.load(cache_path) as cached:
+        return set(cached['hashes'].tolist())
+
+
+def test_unchanged_products_are_served_from_the_cache(tmp_path, embedded_texts):
+    cache_path = str(tmp_path / 'vectors.npz')
+    first = embed_products(PRODUCTS_DF, cache_path=cache_path)
+    assert len(embedded_texts) == 3
+
+    second = embed_products(PRODUCTS_DF, cache_path=cache_path)
+    assert len(embedded_texts) == 3  # All hits
+    assert (first != second).nnz == 0
+    np.testing.assert_allclose(np.asarray(second.multiply(second).sum(axis=1)).ravel(), 1.0)
+
+
+def test_changed_product_is_re_embedded_and_old_vectors_are_pruned(tmp_path, embedded_texts):
+    cache_path = str(tmp_path / 'vectors.npz')
+    embed_products(PRODUCTS_DF, cache_path=cache_path)
+    old_hash = content_hash(product_text(PRODUCTS_DF.iloc[2].to_dict()))
+
+    changed_df = PRODUCTS_DF.copy()
+    changed_df.loc[2, 'description'] = 'A romantic comedy.'
+    changed_df = changed_df.iloc[1:]  # P001 left the catalogue
+    vectors = embed_products(changed_df, cache_path=cache_path)
+
+    assert embedded_texts[3:] == [product_text(changed_df.iloc[1].to_dict())]
+    assert vectors.shape[0] == 2
+    assert _cached_hashes(cache_path) == {content_hash(product_text(p)) for p in changed_df.to_dict('records')}
+    assert old_hash not in _cached_hashes(cache_path)
+
+
+def test_cache_built_with_another_feature_size_is_rebuilt(tmp_path, embedded_texts):
+    cache_path = str(tmp_path / 'vectors.npz')
+    embed_products(PRODUCTS_DF, cache_path=cache_path)
+    with np.load(cache_path) as cached:
+        arrays = dict(cached)
+    arrays['n_features'] = content_model.N_FEATURES // 2
+    np.savez_compressed(cache_path, **arrays)
+
+    embed_products(PRODUCTS_DF, cache_path=cache_path)
+    assert len(embedded_texts) == 6  # Everything embedded again
+    with np.load(cache_path) as cached:
+        assert int(cached['n_features']) == content_model.N_FEATURES
+
+
+def test_unreadable_cache_is_ignored(tmp_path, embedded_texts):
+    cache_path = tmp_path / 'vectors.npz'
+    cache_path.write_bytes(b'not a numpy archive')
+    assert embed_products(PRODUCTS_DF, cache_path=str(cache_path)).shape[0] == 3
+    assert len(embedded_texts) == 3
+
+
+def test_score_users_prefers_similar_text_and_zeroes_unknown_users(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_model, 'CONTENT_MODEL', None)  # Restored after the test
+    model = train_content_model(PRODUCTS_DF, INTERACTIONS_DF, cache_path=str(tmp_path / 'vectors.npz'))
+    scores = model.score_users(['U001', 'U_new', 'U002'])
+
+    assert scores.shape == (3, 3)
+    # U001 bought a drill: the other drill beats the novel
+    assert scores[0, 1] > scores[0, 2]
+    assert not scores[1].any()
+    assert scores[2].argmax() == 2
@@ -0,0 +1,215 @@
+# app/test_explanation_batching.py
+
+import sys
+import os
+import re
+import json
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+
+from app.recommender import (
+    generate_explanations_batch, parse_batch_explanations, EXPLANATION_UNAVAILABLE, EXPLANATION_UNCONFIGURED
+)
+
+PRODUCTS_DF = pd.DataFrame([
+    {'product_id': 'P001', 'name': 'Cordless Drill', 'category': 'Tool', 'price': 99.0, 'description': 'A cordless drill.'},
+    {'product_id': 'P002', 'name': 'Hammer', 'category': 'Tool', 'price': 15.0, 'description': 'A steel hammer.'},
+    {'product_id': 'P003', 'name': 'Cookbook', 'category': 'Book', 'price': 25.0, 'description': 'A cookbook.'},
+])
+INTERACTIONS_DF = pd.DataFrame([
+    {'user_id': 'U001', 'product_id': 'P001', 'type': 'purchase'},
+    {'user_id': 'U002', 'product_id': 'P003', 'type': 'view'},
+])
+PRODUCT_LINE = re.compile(r"product_id: (\w+)\.")
+USER_SECTION = re.compile(r"^\s*User (\w+):$", re.MULTILINE)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeLLM:
+    """
+    Local stand-in for the Gemini client. Answers every product listed in the
+    prompt, except those in `broken` which get an invalid explanation for the
+    first `broken_attempts` calls. With `fail=True` every call raises.
+    """
+    def __init__(self, broken=(), broken_attempts=1, fail=False):
+        self.models = self
+        self.prompts = []
+        self.broken = set(broken)
+        self.broken_attempts = broken_attempts
+        self.fail = fail
+
+    def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents)
+        if self.fail:
+            raise RuntimeError("Gemini is down")
+        entries = []
+        # re.split with a capture group yields [preamble, user_id, section, user_id, section, ...]
+        parts = USER_SECTION.split(contents)
+        for user_id, section in zip(parts[1::2], parts[2::2]):
+            for product_id in PRODUCT_LINE.findall(section):
+                explanation = f"Since you love tools, {user_id} will enjoy {product_id}."
+                if product_id in self.broken and len(self.prompts) <= self.broken_attempts:
+                    explanation = "Our AI algorithm picked this."  # Fails validation
+                entries.append({'user_id': user_id, 'product_id': product_id, 'explanation': explanation})
+        return FakeResponse(json.dumps({'explanations': entries}))
+
+
+def _products(*product_ids):
+    return PRODUCTS_DF[PRODUCTS_DF['product_id'].isin(product_ids)].to_dict('records')
+
+
+def test_single_prompt_for_all_products_of_a_user():
+    llm = FakeLLM()
+    explanations = generate_explanations_batch(
+        {'U001': _products('P001', 'P002', 'P003')}, PRODUCTS_DF, INTERACTIONS_DF, client=llm
+    )
+    assert len(llm.prompts) == 1
+    assert set(explanations) == {('U001', 'P001'), ('U001', 'P002'), ('U001', 'P003')}
+    assert explanations[('U001', 'P002')] == "Since you love tools, U001 will enjoy P002."
+
+
+def test_user_context_appears_once_per_user():
+    llm = FakeLLM()
+    generate_explanations_batch(
+        {'U001': _products('P001', 'P002'), 'U002': _products('P003')}, PRODUCTS_DF, INTERACTIONS_DF, client=llm
+    )
+    assert len(llm.prompts) == 1
+    assert llm.prompts[0].count("- Context:") == 2
+    assert llm.prompts[0].count("Instructions for every explanation") == 1
+
+
+def test_only_failed_items_are_retried():
+    llm = FakeLLM(broken={'P002'})
+    explanations = generate_explanations_batch(
+        {'U001': _products('P001', 'P002', 'P003')}, PRODUCTS_DF, INTERACTIONS_DF, client=llm
+    )
+    assert len(llm.prompts) == 2
+    assert PRODUCT_LINE.findall(llm.prompts[1]) == ['P002']
+    assert explanations[('U001', 'P002')] == "Since you love tools, U001 will enjoy P002."
+
+
+def test_items_failing_every_retry_get_fallback_text():
+    llm = FakeLLM(broken={'P003'}, broken_attempts=99)
+    explanations = generate_explanations_batch(
+        {'U001': _products('P001', 'P003')}, PRODUCTS_DF, INTERACTIONS_DF, client=llm, max_retries=2
+    )
+    assert len(llm.prompts) == 3
+    assert explanations[('U001', 'P003')] == EXPLANATION_UNAVAILABLE
+    assert explanations[('U001', 'P001')] != EXPLANATION_UNAVAILABLE
+
+
+def test_parse_accepts_code_fences_and_ignores_unexpected_entries():
+    response = '```json\n' + json.dumps({'explanations': [
+        {'user_id': 'U001', 'product_id': 'P001', 'explanation': 'Because you love drills.'},
+        {'user_id': 'U001', 'product_id': 'P999', 'explanation': 'Not asked for.'},
+        {'user_id': 'U001', 'product_id': 'P002', 'explanation': ''},
+    ]}) + '\n```'
+    parsed = parse_batch_explanations(response, {('U001', 'P001'), ('U001', 'P002')})
+    assert parsed == {('U001', 'P001'): 'Because you love drills.'}
+    assert parse_batch_explanations("not json", {('U001', 'P001')}) == {}
+
+
+
+def test_forbidden_words_are_allowed_when_the_product_uses_them():
+    camera = {'product_id': 'P010', 'name': 'AI-powered Camera', 'category': 'Electronics', 'description': 'A smart camera.'}
+    response = json.dumps({'explanations': [
+        {'user_id': 'U001', 'product_id': 'P010', 'explanation': 'Your AI-powered Camera suits your gadget habit.'},
+        {'user_id': 'U001', 'product_id': 'P001', 'explanation': 'Our AI picked this drill.'},
+    ]})
+    keys = {('U001', 'P010'), ('U001', 'P001')}
+    products = {('U001', 'P010'): camera, ('U001', 'P001'): _products('P001')[0]}
+    assert parse_batch_explanations(response, keys, products) == {
+        ('U001', 'P010'): 'Your AI-powered Camera suits your gadget habit.',
+    }
+    # Without the product the word is still rejected
+    assert parse_batch_explanations(response, keys) == {}
+
+
+class QuotingLLM(FakeLLM):
+    """Quotes the product name in every explanation."""
+    def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents)
+        entries = [
+            {'user_id': 'U001', 'product_id': 'P010', 'explanation': 'You will love this AI-powered Camera.'}
+        ]
+        return FakeResponse(json.dumps({'explanations': entries}))
+
+
+def test_product_quoting_a_forbidden_word_is_explained_in_one_call():
+    camera = {'product_id': 'P010', 'name': 'AI-powered Camera', 'category': 'Electronics',
+              'price': 300.0, 'description': 'A smart camera.'}
+    llm = QuotingLLM()
+    explanations = generate_explanations_batch({'U001': [camera]}, PRODUCTS_DF, INTERACTIONS_DF, client=llm)
+    assert explanations == {('U001', 'P010'): 'You will love this AI-powered Camera.'}
+    assert len(llm.prompts) == 1
+
+
+class FakeRedisPipeline:
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def hset(self, key, mapping):
+        self.hashes[key] = dict(mapping)
+
+    def execute(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self, hashes=None):
+        self.hashes = hashes or {}
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self.hashes)
+
+
+@pytest.fixture
+def batch_job(monkeypatch):
+    pytest.importorskip('surprise')  # batch_recommender imports the collaborative model
+    import batch_recommender
+    monkeypatch.setattr(batch_recommender, 'redis_client', FakeRedis())
+    return batch_recommender
+
+
+def test_batch_job_does_not_store_fallback_texts(batch_job):
+    batch_job.redis_client.hashes['user:U001:explanations'] = {'P001': 'Stale explanation.'}
+    cached = batch_job.cache_explanations(
+        {'U001': ['P001', 'P002']}, PRODUCTS_DF, INTERACTIONS_DF, client=FakeLLM(fail=True)
+    )
+    assert cached == 0
+    assert batch_job.redis_client.hashes == {}  # Stale entries dropped, no placeholders written
+
+
+def test_batch_job_stores_only_validated_explanations(batch_job):
+    cached = batch_job.cache_explanations(
+        {'U001': ['P001', 'P002', 'P003']}, PRODUCTS_DF, INTERACTIONS_DF,
+        client=FakeLLM(broken={'P002'}, broken_attempts=99),
+    )
+    assert cached == 1
+    assert set(batch_job.redis_client.hashes['user:U001:explanations']) == {'P001', 'P003'}
+
+
+def test_batch_job_skips_explanations_without_an_llm_client(batch_job, monkeypatch):
+    monkeypatch.setattr(batch_job, 'get_genai_client', lambda: None)
+    batch_job.redis_client.hashes['user:U001:explanations'] = {'P001': 'Kept from the last run.'}
+    assert batch_job.cache_explanations({'U001': ['P001']}, PRODUCTS_DF, INTERACTIONS_DF) == 0
+    assert batch_job.redis_client.hashes == {'user:U001:explanations': {'P001': 'Kept from the last run.'}}
+
+
+def test_unconfigured_client_gets_the_api_key_placeholder(monkeypatch):
+    from app import recommender
+    monkeypatch.setattr(recommender, 'get_genai_client', lambda: None)
+    explanations = generate_explanations_batch({'U001': _products('P001')}, PRODUCTS_DF, INTERACTIONS_DF)
+    assert explanations == {('U001', 'P001'): EXPLANATION_UNCONFIGURED}
+    assert recommender.is_fallback_explanation(EXPLANATION_UNCONFIGURED)
+    assert recommender.is_fallback_explanation(EXPLANATION_UNAVAILABLE)
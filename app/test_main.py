@@ -0,0 +1,195 @@
+# app/test_main.py
+
+import sys
+import os
+import time
+import json
+import asyncio
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app import main
+from app.metrics import ERRORS
+from app.models import InteractionEvent
+from app.response_cache import ResponseCache, RECOMMENDATIONS_VERSION_KEY
+
+PRODUCTS_DF = pd.DataFrame([
+    {'product_id': 'P001', 'name': 'Drill', 'category': 'Tool', 'price': 10.0, 'description': 'A drill.'},
+])
+USERS_DF = pd.DataFrame([{'user_id': 'U001', 'name': 'Test User'}])
+INTERACTIONS_DF = pd.DataFrame([
+    {'user_id': 'U001', 'product_id': 'P001', 'type': 'view', 'timestamp': pd.Timestamp('2025-01-01')},
+])
+
+
+class SlowRedis:
+    """Answers GET after a delay, like a stalled Redis."""
+    def __init__(self, values, delay=0.0):
+        self.values = values
+        self.delay = delay
+
+    def get(self, key):
+        time.sleep(self.delay)
+        return self.values.get(key)
+
+
+@pytest.fixture
+def serving_state(monkeypatch):
+    for name in ('PRODUCTS_DF', 'USERS_DF', 'INTERACTIONS_DF', 'ONLINE_FALLBACK', 'RECENT_ITEMS', 'USER_IDS',
+                 'redis_client', '_EVENT_LOOP'):
+        monkeypatch.setattr(main, name, getattr(main, name))  # Restored after the test
+    monkeypatch.setattr(main, 'WARMUP_STATE', dict(main.WARMUP_STATE))
+    monkeypatch.setattr(main, 'RESPONSE_CACHE', ResponseCache('response'))
+    monkeypatch.setattr(main, 'EXPLANATION_CACHE', ResponseCache('generated_explanation'))
+    main._EVENT_LOOP = None
+    main.install_data(PRODUCTS_DF, USERS_DF, INTERACTIONS_DF, source='test')
+    return main
+
+
+def test_unknown_users_get_a_404(serving_state):
+    serving_state.redis_client = SlowRedis({})
+    assert serving_state.USER_IDS == frozenset({'U001'})
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(serving_state.get_hybrid_recommendations_for_user('U404', top_n=5, offset=0))
+    assert error.value.status_code == 404
+
+
+def test_version_is_polled_off_the_event_loop(serving_state, monkeypatch):
+    monkeypatch.setattr(main, 'VERSION_CHECK_SECONDS', 0.01)
+    serving_state.redis_client = SlowRedis({RECOMMENDATIONS_VERSION_KEY: 'v2'}, delay=0.2)
+    serving_state.RESPONSE_CACHE.put((None, ('U001', 5, 0)), 'stale response')
+
+    async def scenario():
+        poller = asyncio.ensure_future(main.poll_recommendations_version())
+        # The loop keeps serving while the poller waits on a slow Redis
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - started < 0.15
+        while main.RESPONSE_CACHE.version != 'v2':
+            await asyncio.sleep(0.01)
+        poller.cancel()
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+    assert serving_state.RESPONSE_CACHE.peek(('U001', 5, 0)) is None
+    assert serving_state.EXPLANATION_CACHE.version == 'v2'
+
+
+def _readiness(state):
+    response = asyncio.run(state.readiness())
+    return response.status_code, json.loads(response.body)
+
+
+def test_not_ready_without_redis(serving_state):
+    serving_state.redis_client = None
+    status_code, body = _readiness(serving_state)
+    assert status_code == 503
+    assert body['status'] == 'ready' and not body['redis_connected']
+
+    serving_state.redis_client = SlowRedis({})
+    assert _readiness(serving_state)[0] == 200
+
+
+@pytest.fixture
+def warm_up_sources(serving_state, monkeypatch):
+    """Replaces Redis, the snapshot and MongoDB with local stand-ins, starting from a cold state."""
+    sources = {'snapshot': None, 'mongodb': (PRODUCTS_DF, USERS_DF, INTERACTIONS_DF)}
+
+    def load(name):
+        value = sources[name]
+        if isinstance(value, Exception):
+            raise value
+        return value
+    monkeypatch.setattr(main, 'connect_redis', lambda: setattr(main, 'redis_client', SlowRedis({})))
+    monkeypatch.setattr(main, 'load_snapshot', lambda: load('snapshot'))
+    monkeypatch.setattr(main, 'load_data', lambda: load('mongodb'))
+    monkeypatch.setattr(main, 'save_snapshot', lambda *frames: None)
+    main.WARMUP_STATE.update(status='starting', data_source=None, refreshing=False, error=None)
+    return sources
+
+
+def test_warm_up_becomes_ready_from_mongodb(warm_up_sources):
+    main.warm_up()
+    assert main.WARMUP_STATE['status'] == 'ready'
+    assert main.WARMUP_STATE['data_source'] == 'mongodb'
+    assert _readiness(main)[0] == 200
+
+
+def test_warm_up_exception_marks_the_service_failed(warm_up_sources):
+    warm_up_sources['snapshot'] = ValueError("corrupt snapshot")
+    errors_before = ERRORS.labels(component='warm_up')._value.get()
+    main.warm_up()
+    assert main.WARMUP_STATE['status'] == 'failed'
+    assert main.WARMUP_STATE['error'] == "corrupt snapshot"
+    assert ERRORS.labels(component='warm_up')._value.get() == errors_before + 1
+    assert _readiness(main)[0] == 503
+
+
+def test_failed_refresh_keeps_serving_the_snapshot(warm_up_sources):
+    warm_up_sources['snapshot'] = (PRODUCTS_DF, USERS_DF, INTERACTIONS_DF)
+    warm_up_sources['mongodb'] = ConnectionError("mongodb down")
+    main.warm_up()
+    assert main.WARMUP_STATE['status'] == 'ready'
+    assert main.WARMUP_STATE['data_source'] == 'snapshot'
+    assert main.WARMUP_STATE['error'] == "mongodb down" and not main.WARMUP_STATE['refreshing']
+    assert _readiness(main)[0] == 200
+
+
+def _report(state, user_id='U001', product_id='P001'):
+    return asyncio.run(state.record_user_interaction(
+        InteractionEvent(user_id=user_id, product_id=product_id, type='view')
+    ))
+
+
+def test_reported_interactions_are_validated(serving_state, monkeypatch):
+    redis_client = pytest.importorskip('fakeredis').FakeRedis(decode_responses=True)
+    serving_state.redis_client = redis_client
+    monkeypatch.setattr(main, 'INTERACTION_GENERATION', {})
+
+    for user_id, product_id in (('U404', 'P001'), ('U001', 'P404')):
+        with pytest.raises(HTTPException) as error:
+            _report(serving_state, user_id, product_id)
+        assert error.value.status_code == 404
+    assert redis_client.keys('*') == []  # Nothing written for unknown IDs
+
+    serving_state.WARMUP_STATE['status'] = 'loading'
+    with pytest.raises(HTTPException) as error:
+        _report(serving_state)
+    assert error.value.status_code == 503
+
+
+def test_computation_in_flight_during_an_interaction_is_not_served_after_it(serving_state, monkeypatch):
+    serving_state.redis_client = pytest.importorskip('fakeredis').FakeRedis(decode_responses=True)
+    monkeypatch.setattr(main, 'INTERACTION_GENERATION', {})
+    releases = []
+
+    async def build_recommendations(user_id, top_n, offset=0):
+        release = asyncio.Event()
+        releases.append(release)
+        response = [f"computed before {len(releases) - 1} interactions"]
+        await release.wait()
+        return response, True
+    monkeypatch.setattr(main, 'build_recommendations', build_recommendations)
+
+    def request():
+        return asyncio.ensure_future(main.get_hybrid_recommendations_for_user('U001', top_n=5, offset=0))
+
+    async def scenario():
+        before = request()
+        await asyncio.sleep(0)
+        await main.record_user_interaction(InteractionEvent(user_id='U001', product_id='P001', type='view'))
+        # A request after the interaction does not coalesce onto the older computation
+        after = request()
+        await asyncio.sleep(0.01)
+        assert len(releases) == 2
+        for release in releases:
+            release.set()
+        assert await before == ["computed before 0 interactions"]
+        assert await after == ["computed before 1 interactions"]
+        # The stale result finished last but is never served again
+        assert await request() == ["computed before 1 interactions"]
+        assert len(releases) == 2
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+# app/test_metrics.py
+
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.metrics import BATCH_DURATION, push_batch_metrics, render_metrics
+
+
+class FakePushgateway(BaseHTTPRequestHandler):
+    pushes = []
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        FakePushgateway.pushes.append((self.path, body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_batch_metrics_are_pushed_and_not_served_by_the_api():
+    server = HTTPServer(('127.0.0.1', 0), FakePushgateway)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        BATCH_DURATION.set(12.5)
+        push_batch_metrics(f"127.0.0.1:{server.server_port}")
+    finally:
+        server.shutdown()
+
+    path, body = FakePushgateway.pushes[-1]
+    assert path == '/metrics/job/recommender_batch'
+    assert 'recommender_batch_last_duration_seconds 12.5' in body
+    assert 'recommender_request_seconds' not in body  # Only the batch registry is pushed
+    assert b'recommender_batch_last_duration_seconds' not in render_metrics()[0]
+
+
+def test_push_failures_do_not_raise():
+    push_batch_metrics("127.0.0.1:1")  # Nothing listens here
@@ -0,0 +1,77 @@
+# app/test_online_fallback.py
+
+import sys
+import os
+import json
+import threading
+from concurrent.futures import Future
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+
+from app.online_fallback import OnlineFallback
+
+PRODUCTS_DF = pd.DataFrame([
+    {'product_id': 'P001', 'category': 'Tool', 'price': 10.0},
+    {'product_id': 'P002', 'category': 'Tool', 'price': 20.0},
+    {'product_id': 'P003', 'category': 'Book', 'price': 30.0},
+])
+INTERACTIONS_DF = pd.DataFrame([
+    {'user_id': 'U001', 'product_id': 'P001', 'type': 'purchase'},
+    {'user_id': 'U002', 'product_id': 'P003', 'type': 'purchase'},
+    {'user_id': 'U002', 'product_id': 'P003', 'type': 'view'},
+])
+
+
+class FakeRedis:
+    def __init__(self):
+        self.writes = {}
+
+    def set(self, key, value, ex=None, nx=False):
+        self.writes[key] = json.loads(value)
+
+
+class ImmediateExecutor:
+    """Runs work inside submit(), so the future is already done when it is returned."""
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def _recommend_with_timeout(fallback, user_id, seconds=5):
+    result = []
+    worker = threading.Thread(target=lambda: result.append(fallback.recommend(user_id)), daemon=True)
+    worker.start()
+    worker.join(seconds)
+    assert not worker.is_alive(), "recommend() deadlocked"
+    return result[0]
+
+
+def test_computation_finished_before_callback_is_registered():
+    redis_client = FakeRedis()
+    fallback = OnlineFallback(PRODUCTS_DF, INTERACTIONS_DF, redis_client, top_n=3)
+    fallback._executor = ImmediateExecutor()
+
+    product_ids, personalized = _recommend_with_timeout(fallback, 'U001')
+    assert personalized
+    assert 'P001' not in product_ids  # Already purchased
+    assert redis_client.writes['user:U001:recommendations'] == product_ids
+    # The lock was released, so the next miss is served too
+    assert _recommend_with_timeout(fallback, 'U002')[1]
+
+
+def test_over_budget_and_overloaded_misses_are_not_personalized():
+    release = threading.Event()
+    fallback = OnlineFallback(PRODUCTS_DF, INTERACTIONS_DF, None, top_n=3, budget_seconds=0.01, max_pending=1)
+    fallback._compute = lambda user_id: release.wait(5) and ['P002']
+    try:
+        assert fallback.recommend('U001') == (fallback.popular_ids, False)  # Over budget
+        assert fallback.recommend('U002') == (fallback.popular_ids, False)  # Overloaded
+    finally:
+        release.set()
+        fallback.shutdown()
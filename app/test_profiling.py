@@ -0,0 +1,45 @@
+# app/test_profiling.py
+
+import sys
+import os
+import json
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.profiling import BatchProfiler
+
+
+def test_blocks_and_sampled_users_are_reported_separately(tmp_path):
+    profiler = BatchProfiler(enabled=True, users_sampled_per_block=2)
+    profiler.start()
+    profiler.record_block(256, 0.5)
+    profiler.record_block(100, 0.25)
+    for seconds in (0.001, 0.002, 0.010, 0.001):
+        profiler.record_user(seconds)
+    report = profiler.write_report(str(tmp_path / 'profile.json'))
+
+    # One sample per block, not one copy per user
+    assert report['per_block_latency']['count'] == 2
+    assert report['per_block_latency']['max_ms'] == 500.0
+    assert report['per_block_latency']['mean_users_per_block'] == 178.0
+    # Real per-user samples keep their spread
+    assert report['per_user_latency']['count'] == 4
+    assert report['per_user_latency']['max_ms'] == 10.0
+    assert report['per_user_latency']['p50_ms'] < report['per_user_latency']['max_ms']
+    assert json.loads((tmp_path / 'profile.json').read_text())['per_user_latency']['count'] == 4
+
+
+def test_sampling_picks_distinct_users_from_the_block():
+    profiler = BatchProfiler(enabled=True, users_sampled_per_block=3)
+    block = [f"U{i:03d}" for i in range(10)]
+    sampled = profiler.sample_users(block)
+    assert len(sampled) == 3 and len(set(sampled)) == 3 and set(sampled) <= set(block)
+    assert len(profiler.sample_users(block[:2])) == 2
+
+
+def test_disabled_profiler_samples_and_records_nothing():
+    profiler = BatchProfiler(enabled=False)
+    assert profiler.sample_users(['U001', 'U002']) == []
+    profiler.record_block(10, 1.0)
+    profiler.record_user(1.0)
+    assert profiler.block_latencies == [] and profiler.user_latencies == []
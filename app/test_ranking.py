@@ -0,0 +1,116 @@
+# app/test_ranking.py
+
+import sys
+import os
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ranking import RankingPipeline, normalize_scores, weighted_fusion, reciprocal_rank_fusion, RRF_K
+
+PRODUCTS_DF = pd.DataFrame([
+    {'product_id': 'P001', 'category': 'Tool', 'price': 10.0, 'in_stock': True},
+    {'product_id': 'P002', 'category': 'Tool', 'price': 20.0, 'in_stock': True},
+    {'product_id': 'P003', 'category': 'Book', 'price': 30.0, 'in_stock': False},
+    {'product_id': 'P004', 'category': 'Book', 'price': 40.0, 'in_stock': True},
+    {'product_id': 'P005', 'category': 'Toy', 'price': 50.0, 'in_stock': True},
+])
+INTERACTIONS_DF = pd.DataFrame([
+    {'user_id': 'U001', 'product_id': 'P001', 'type': 'purchase'},
+    {'user_id': 'U001', 'product_id': 'P002', 'type': 'view'},
+    {'user_id': 'U002', 'product_id': 'P001', 'type': 'purchase'},
+    {'user_id': 'U002', 'product_id': 'P003', 'type': 'purchase'},
+    {'user_id': 'U003', 'product_id': 'P004', 'type': 'add_to_cart'},
+    {'user_id': 'U003', 'product_id': 'P005', 'type': 'view'},
+])
+
+
+def _ranked_ids(pipeline, user_id, **filters):
+    return [pid for pid, _ in pipeline.rank([user_id], top_n=10, **filters)[0]]
+
+
+def test_minmax_normalization_and_rows_without_spread():
+    scores = np.array([
+        [1.0, 2.0, 3.0],
+        [2.0, 2.0, 2.0],            # No spread: no signal for this user
+        [np.nan, np.nan, np.nan],   # Generator has no opinion at all
+        [np.nan, 0.0, 4.0],
+    ])
+    normalized = normalize_scores(scores, 'minmax')
+    np.testing.assert_allclose(normalized[0], [0.0, 0.5, 1.0])
+    assert np.isnan(normalized[1]).all()
+    assert np.isnan(normalized[2]).all()
+    assert np.isnan(normalized[3, 0])
+    np.testing.assert_allclose(normalized[3, 1:], [0.0, 1.0])
+
+
+def test_zscore_normalization_and_unknown_method():
+    normalized = normalize_scores(np.array([[1.0, 3.0], [5.0, 5.0]]), 'zscore')
+    np.testing.assert_allclose(normalized[0], [-1.0, 1.0])
+    assert np.isnan(normalized[1]).all()
+    with pytest.raises(ValueError):
+        normalize_scores(np.ones((1, 2)), 'softmax')
+
+
+def test_weighted_fusion_ignores_missing_scores():
+    blocks = {
+        'content': np.array([[1.0, np.nan, 0.0]]),
+        'popularity': np.array([[0.0, 1.0, np.nan]]),
+    }
+    fused = weighted_fusion(blocks, {'content': 0.75, 'popularity': 0.25})
+    np.testing.assert_allclose(fused, [[0.75, 0.25, 0.0]])
+
+
+def test_reciprocal_rank_fusion_uses_ranks_not_scores():
+    blocks = {
+        'content': np.array([[0.9, 0.1, np.nan]]),
+        'popularity': np.array([[100.0, 200.0, 300.0]]),
+    }
+    fused = reciprocal_rank_fusion(blocks, {'content': 1.0, 'popularity': 1.0})
+    expected = [
+        1 / (RRF_K + 1) + 1 / (RRF_K + 3),
+        1 / (RRF_K + 2) + 1 / (RRF_K + 2),
+        1 / (RRF_K + 1),  # The NaN content score contributes nothing
+    ]
+    np.testing.assert_allclose(fused, [expected])
+
+
+def test_filters_exclude_out_of_stock_purchased_and_out_of_band_items():
+    pipeline = RankingPipeline(PRODUCTS_DF, INTERACTIONS_DF, weights={'popularity': 1.0})
+    # P003 is out of stock, P001 was purchased by U001
+    assert set(_ranked_ids(pipeline, 'U001')) == {'P002', 'P004', 'P005'}
+    assert 'P003' in _ranked_ids(pipeline, 'U001', in_stock_only=False)
+    assert set(_ranked_ids(pipeline, 'U001', min_price=15, max_price=45)) == {'P002', 'P004'}
+    # exclude_seen also drops viewed items
+    assert 'P002' not in _ranked_ids(pipeline, 'U001', exclude_seen=True)
+    # Unknown users get every in-stock item
+    assert set(_ranked_ids(pipeline, 'U999')) == {'P001', 'P002', 'P004', 'P005'}
+
+
+def test_rank_orders_by_fused_score():
+    pipeline = RankingPipeline(PRODUCTS_DF, INTERACTIONS_DF, weights={'popularity': 1.0})
+    ranked = pipeline.rank(['U999'], top_n=2)[0]
+    # P001 has two purchases, the strongest popularity signal
+    assert ranked[0][0] == 'P001'
+    assert len(ranked) == 2 and ranked[0][1] >= ranked[1][1]
+
+
+def test_vectorised_svd_scores_match_predict(monkeypatch):
+    pytest.importorskip('surprise')
+    from app import advanced_recommender
+    monkeypatch.setattr(advanced_recommender, 'COLLAB_MODEL', None)  # Restored after the test
+
+    interactions_df = pd.DataFrame([
+        {'user_id': f"U{u:03d}", 'product_id': f"P{(u * 7 + i) % 12:03d}", 'type': kind}
+        for u in range(15) for i, kind in enumerate(['view', 'purchase', 'add_to_cart', 'view'])
+    ])
+    algo = advanced_recommender.train_collaborative_model(interactions_df)
+    user_ids = ['U000', 'U007', 'U_new']      # Includes a user unknown to the model
+    product_ids = ['P000', 'P005', 'P011', 'P_new']  # and an unknown item
+    scores = advanced_recommender.score_collaborative_batch(user_ids, product_ids)
+
+    expected = np.array([[algo.predict(uid, pid).est for pid in product_ids] for uid in user_ids])
+    np.testing.assert_allclose(scores, expected, atol=1e-5)
@@ -0,0 +1,90 @@
+# app/test_recommendation_store.py
+
+import sys
+import os
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from app.models import InteractionEvent
+from app.recommendation_store import (
+    paginate, recent_items_by_user, write_ranked, record_interaction, read_user_recommendations, recent_key
+)
+
+RANKED_IDS = ['P001', 'P002', 'P003', 'P004', 'P005', 'P006']
+
+
+def test_pages_are_contiguous_slices():
+    assert paginate(RANKED_IDS, None, offset=0, top_n=2) == ['P001', 'P002']
+    assert paginate(RANKED_IDS, None, offset=2, top_n=2) == ['P003', 'P004']
+    assert paginate(RANKED_IDS, None, offset=5, top_n=10) == ['P006']
+    assert paginate(RANKED_IDS, None, offset=10, top_n=2) == []
+
+
+def test_excluded_items_are_dropped_before_slicing():
+    # Pages stay full and never repeat an item when recent interactions are filtered out
+    exclude = frozenset({'P002', 'P003'})
+    assert paginate(RANKED_IDS, exclude, offset=0, top_n=2) == ['P001', 'P004']
+    assert paginate(RANKED_IDS, exclude, offset=2, top_n=2) == ['P005', 'P006']
+
+
+def test_recent_items_keep_only_the_latest_interactions():
+    interactions_df = pd.DataFrame([
+        {'user_id': 'U001', 'product_id': 'P001', 'timestamp': pd.Timestamp('2025-01-03')},
+        {'user_id': 'U001', 'product_id': 'P002', 'timestamp': pd.Timestamp('2025-01-01')},
+        {'user_id': 'U001', 'product_id': 'P003', 'timestamp': pd.Timestamp('2025-01-02')},
+        {'user_id': 'U002', 'product_id': 'P004', 'timestamp': pd.Timestamp('2025-01-01')},
+    ])
+    recent = recent_items_by_user(interactions_df, limit=2)
+    assert recent == {'U001': frozenset({'P001', 'P003'}), 'U002': frozenset({'P004'})}
+    assert recent_items_by_user(interactions_df.iloc[0:0], limit=2) == {}
+
+
+def test_reported_interactions_keep_only_the_latest():
+    fakeredis = pytest.importorskip('fakeredis')
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    redis_pipe = redis_client.pipeline()
+    write_ranked(redis_pipe, 'U001', [('P001', 0.9), ('P002', 0.5)])
+    for timestamp, product_id in enumerate(['P001', 'P002', 'P003']):
+        record_interaction(redis_pipe, 'U001', product_id, float(timestamp), limit=2)
+    redis_pipe.execute()
+
+    assert read_user_recommendations(redis_client, 'U001') == (['P001', 'P002'], frozenset({'P002', 'P003'}))
+    assert redis_client.ttl(recent_key('U001')) > 0
+    assert read_user_recommendations(redis_client, 'U999') == (None, frozenset())
+
+
+def test_interactions_after_the_data_load_are_filtered_out(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    from app import main
+    from app.response_cache import ResponseCache
+
+    products_df = pd.DataFrame([
+        {'product_id': pid, 'name': pid, 'category': 'Tool', 'price': 10.0, 'description': 'A tool.'}
+        for pid in RANKED_IDS
+    ])
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    redis_pipe = redis_client.pipeline()
+    write_ranked(redis_pipe, 'U001', [(pid, -rank) for rank, pid in enumerate(RANKED_IDS)])
+    redis_pipe.execute()
+    monkeypatch.setattr(main, 'redis_client', redis_client)
+    monkeypatch.setattr(main, 'PRODUCTS_DF', products_df)
+    monkeypatch.setattr(main, 'RECENT_ITEMS', {'U001': frozenset({'P001'})})  # Purchased before the load
+    monkeypatch.setattr(main, 'USER_IDS', frozenset({'U001'}))
+    monkeypatch.setattr(main, 'PRODUCT_IDS', frozenset(RANKED_IDS))
+    monkeypatch.setattr(main, 'WARMUP_STATE', {**main.WARMUP_STATE, 'status': 'ready'})
+    monkeypatch.setattr(main, 'INTERACTION_GENERATION', {})
+    monkeypatch.setattr(main, 'RESPONSE_CACHE', ResponseCache('response'))
+    main.RESPONSE_CACHE.put((None, main.response_cache_key('U001', 3, 0)), 'stale response')
+
+    # Viewed after the data was loaded
+    asyncio.run(main.record_user_interaction(InteractionEvent(user_id='U001', product_id='P002', type='view')))
+
+    products, personalized = main.resolve_recommended_products('U001', top_n=3)
+    assert [p['product_id'] for p in products] == ['P003', 'P004', 'P005']
+    assert personalized
+    assert main.RESPONSE_CACHE.peek(main.response_cache_key('U001', 3, 0)) is None
@@ -0,0 +1,127 @@
+# app/test_response_cache.py
+
+import sys
+import os
+import asyncio
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import response_cache
+from app.response_cache import ResponseCache
+
+
+class SlowCompute:
+    """Counts calls and blocks every call until release() is called."""
+    def __init__(self, value='response', error=None):
+        self.calls = 0
+        self.value = value
+        self.error = error
+        self.released = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.released.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def release(self):
+        self.released.set()
+
+
+def test_concurrent_requests_share_one_computation():
+    async def scenario():
+        cache, compute = ResponseCache('test'), SlowCompute()
+        waiters = [asyncio.ensure_future(cache.get_or_compute('U001', compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        compute.release()
+        assert await asyncio.gather(*waiters) == ['response'] * 5
+        assert compute.calls == 1
+        # Later requests are served from the cache
+        assert await cache.get_or_compute('U001', compute) == 'response'
+        assert compute.calls == 1
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    async def scenario():
+        cache, compute = ResponseCache('test'), SlowCompute()
+        leader = asyncio.ensure_future(cache.get_or_compute('U001', compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute('U001', compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        compute.release()
+        assert await follower == 'response'
+        assert leader.cancelled()
+        assert compute.calls == 1
+        assert cache.peek('U001') == 'response'
+    asyncio.run(scenario())
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache, compute = ResponseCache('test'), SlowCompute(error=RuntimeError("redis down"))
+        waiters = [asyncio.ensure_future(cache.get_or_compute('U001', compute)) for _ in range(2)]
+        await asyncio.sleep(0)
+        compute.release()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert len(cache) == 0
+        compute.error = None
+        assert await cache.get_or_compute('U001', compute) == 'response'
+        assert compute.calls == 2
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache('test', ttl_seconds=60)
+    cache.put('key', 'value')
+    now[0] += 59
+    assert cache.get('key') == 'value'
+    now[0] += 2
+    assert cache.get('key') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache('test', max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_new_version_drops_entries_and_skips_stale_results():
+    async def scenario():
+        cache, compute = ResponseCache('test'), SlowCompute('v1 response')
+        cache.set_version('v1')
+        waiter = asyncio.ensure_future(cache.get_or_compute('U001', compute))
+        await asyncio.sleep(0)
+        cache.set_version('v2')  # The batch job published while we were computing
+        compute.release()
+        assert await waiter == 'v1 response'
+        assert cache.peek('U001') is None  # Not stored under the new version
+
+        cache.put(('v2', 'U002'), 'cached')
+        cache.set_version('v2')  # Unchanged version keeps entries
+        assert cache.peek('U002') == 'cached'
+        cache.set_version('v3')
+        assert cache.peek('U002') is None
+    asyncio.run(scenario())
+
+
+def test_values_rejected_by_should_cache_are_returned_but_not_stored():
+    async def scenario():
+        cache = ResponseCache('test')
+
+        async def bestsellers():
+            return ['P001'], False  # Degraded: not personalized
+        assert await cache.get_or_compute('U001', bestsellers, should_cache=lambda r: r[1]) == (['P001'], False)
+        assert cache.peek('U001') is None
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+# app/test_streaming.py
+
+import sys
+import os
+import time
+import json
+import asyncio
+# Add the project root to the path so 'app' imports work
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+
+from app import main
+from app.metrics import start_trace
+from app.recommender import EXPLANATION_UNAVAILABLE
+from app.response_cache import ResponseCache
+
+PRODUCTS = [
+    {'product_id': f"P00{i}", 'name': f"Product {i}", 'category': 'Tool', 'price': 10.0 * i, 'description': 'A tool.'}
+    for i in range(1, 4)
+]
+INTERACTIONS_DF = pd.DataFrame([
+    {'user_id': 'U001', 'product_id': 'P001', 'type': 'purchase'},
+])
+
+
+class FakeExplainer:
+    """Stands in for generate_explanations_batch; counts calls and takes a while to answer."""
+    def __init__(self, text="Matches your interest in tools."):
+        self.calls = 0
+        self.text = text
+
+    def __call__(self, items_by_user, products_df, interactions_df):
+        self.calls += 1
+        time.sleep(0.05)
+        return {(uid, p['product_id']): self.text for uid, products in items_by_user.items() for p in products}
+
+
+@pytest.fixture
+def explainer(monkeypatch):
+    explainer = FakeExplainer()
+    monkeypatch.setattr(main, 'RESPONSE_CACHE', ResponseCache('response'))
+    monkeypatch.setattr(main, 'EXPLANATION_CACHE', ResponseCache('generated_explanation'))
+    monkeypatch.setattr(main, 'INTERACTIONS_DF', INTERACTIONS_DF)
+    monkeypatch.setattr(main, 'resolve_recommended_products', lambda user_id, top_n, offset=0: (PRODUCTS[:top_n], True))
+    monkeypatch.setattr(main, 'get_cached_explanations', lambda user_id: {'P001': 'Pre-computed.'})
+    monkeypatch.setattr(main, 'generate_explanations_batch', explainer)
+    return explainer
+
+
+async def _stream(user_id='U001', top_n=3):
+    return [event async for event in main.recommendation_events(user_id, top_n)]
+
+
+def test_streamed_response_is_cached_for_later_requests(explainer):
+    async def scenario():
+        events = await _stream()
+        assert events[-1].startswith('event: done')
+        assert sum(e.startswith('event: explanation') for e in events) == 3
+
+        recommendations, cacheable = main.RESPONSE_CACHE.peek(main.response_cache_key('U001', 3, 0))
+        assert cacheable
+        assert [r.explanation for r in recommendations] == ['Pre-computed.'] + [explainer.text] * 2
+
+        # The JSON endpoint and the next stream are served from the cache
+        assert (await main.RESPONSE_CACHE.get_or_compute(main.response_cache_key('U001', 3, 0), None))[0] == recommendations
+        assert len(await _stream()) == 4  # Three full cards and done
+        assert explainer.calls == 1
+    asyncio.run(scenario())
+
+
+def test_concurrent_stream_and_json_requests_share_one_llm_call(explainer):
+    async def scenario():
+        events, (recommendations, _) = await asyncio.gather(_stream(), main.build_recommendations('U001', 3))
+        assert events[-1].startswith('event: done')
+        assert len(recommendations) == 3
+        assert explainer.calls == 1
+    asyncio.run(scenario())
+
+
+def test_placeholder_explanations_are_streamed_but_not_cached(explainer):
+    explainer.text = EXPLANATION_UNAVAILABLE
+
+    async def scenario():
+        assert (await _stream())[-1].startswith('event: done')
+        assert main.RESPONSE_CACHE.peek(main.response_cache_key('U001', 3, 0)) is None
+        await _stream()
+        assert explainer.calls == 2  # The LLM is retried
+    asyncio.run(scenario())
+
+
+def test_stream_duration_is_recorded_up_to_done(explainer):
+    async def scenario():
+        with start_trace():
+            events = await _stream()
+        done = json.loads(events[-1].split('data: ', 1)[1])
+        assert done['count'] == 3
+        # The LLM call (>= 50 ms here) happens after the headers, but is part of the stream's total
+        timings = dict(part.split(';dur=') for part in done['server_timing'].split(', '))
+        assert float(timings['stream_total']) >= 50
+        assert 'explanation' in timings
+    asyncio.run(scenario())
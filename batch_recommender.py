@@ -1,90 +1,208 @@
 # batch_recommender.py
 
 import os
-import json
+import argparse
 import redis
 import sys
+import time
 from dotenv import load_dotenv
 
 # Add the 'app' directory to the Python path to allow imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'app')))
 
 from app.data_loader import load_data
-from app.recommender import get_content_based_recommendations
-from app.advanced_recommender import train_collaborative_model, get_collaborative_filtering_recommendations
+from app.content_model import train_content_model
+from app.advanced_recommender import train_collaborative_model
+from app.ranking import RankingPipeline, DEFAULT_WEIGHTS
+from app.recommender import generate_explanations_batch, get_genai_client, is_fallback_explanation
+from app.metrics import (
+    BATCH_REGISTRY, BATCH_USERS, BATCH_DURATION, BATCH_THROUGHPUT, BATCH_LAST_SUCCESS, push_batch_metrics
+)
+from app.profiling import BatchProfiler
+from app.response_cache import RECOMMENDATIONS_VERSION_KEY
+from app.recommendation_store import RANKED_DEPTH, write_ranked, list_key
 
 # --- Configuration & Connections ---
 load_dotenv()
-TOP_N_RECOMMENDATIONS = 10 # Number of recommendations to pre-compute for each user
-
-# Connect to Redis
-try:
-    # `decode_responses=True` ensures Redis returns strings, not bytes
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-    redis_client.ping() # Check the connection
-    print("✅ INFO: Successfully connected to Redis.")
-except redis.exceptions.ConnectionError as e:
-    print(f"❌ FATAL ERROR: Could not connect to Redis. Is the Docker container running? {e}")
-    exit()
-
-def run_batch_recommendation_job():
+TOP_N_RECOMMENDATIONS = RANKED_DEPTH # Scored candidates to pre-compute for each user; the API pages through them
+USER_BLOCK_SIZE = 256 # Users scored together in one matrix operation
+# Fusion method ('weighted' or 'rrf') for the hybrid ranking; generator weights are ranking.DEFAULT_WEIGHTS
+RANKING_FUSION = os.getenv("RANKING_FUSION", "weighted")
+EXPLAIN_TOP_N = 5 # With --explanations, pre-compute explanations for this many top items per user
+EXPLANATION_USERS_PER_PROMPT = 5 # Users whose items share one batched LLM prompt
+# Set to expose the batch job's Prometheus metrics while it runs, e.g. BATCH_METRICS_PORT=9101.
+# The job usually exits before Prometheus scrapes it, so to keep the final
+# duration/throughput set BATCH_PUSHGATEWAY_URL (e.g. localhost:9091): the
+# metrics are pushed to that Prometheus Pushgateway when the job finishes.
+BATCH_METRICS_PORT = os.getenv("BATCH_METRICS_PORT")
+BATCH_PUSHGATEWAY_URL = os.getenv("BATCH_PUSHGATEWAY_URL")
+
+redis_client = None # Connected when the job starts, so importing this module has no side effects
+
+def connect_redis():
+    global redis_client
+    try:
+        # `decode_responses=True` ensures Redis returns strings, not bytes
+        redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        redis_client.ping() # Check the connection
+        print("✅ INFO: Successfully connected to Redis.")
+    except redis.exceptions.ConnectionError as e:
+        print(f"❌ FATAL ERROR: Could not connect to Redis. Is the Docker container running? {e}")
+        exit()
+
+def cache_explanations(user_recs: dict, products_df, interactions_df, client=None) -> int:
+    """
+    Generates explanations for each user's top EXPLAIN_TOP_N items, packing
+    several users into one LLM prompt, and stores them in Redis hashes
+    ("user:{user_id}:explanations", product_id -> explanation) that the API reads first.
+    Only real explanations are stored: items that fell back to the
+    "unavailable" text are left for the API to generate (and retry) itself.
+    Returns the number of users with at least one explanation stored.
+    """
+    if (client or get_genai_client()) is None:
+        print("WARN: LLM client unavailable; not pre-computing explanations.")
+        return 0
+
+    products_by_id = products_df.drop_duplicates('product_id').set_index('product_id', drop=False)
+    user_ids = [uid for uid, rec_ids in user_recs.items() if rec_ids]
+    cached = 0
+    for start in range(0, len(user_ids), EXPLANATION_USERS_PER_PROMPT):
+        items_by_user = {
+            uid: products_by_id.loc[user_recs[uid][:EXPLAIN_TOP_N]].to_dict('records')
+            for uid in user_ids[start:start + EXPLANATION_USERS_PER_PROMPT]
+        }
+        explanations = generate_explanations_batch(items_by_user, products_df, interactions_df, client=client)
+
+        redis_pipe = redis_client.pipeline(transaction=False)
+        for uid in items_by_user:
+            redis_key = f"user:{uid}:explanations"
+            fields = {
+                pid: text for (owner, pid), text in explanations.items()
+                if owner == uid and not is_fallback_explanation(text)
+            }
+            redis_pipe.delete(redis_key) # Drop explanations for items no longer recommended
+            if fields:
+                redis_pipe.hset(redis_key, mapping=fields)
+                cached += 1
+        redis_pipe.execute()
+    return cached
+
+def run_batch_recommendation_job(profiler: BatchProfiler = None, with_explanations: bool = False):
     """
     The main batch processing job. It loads data, trains models,
     generates recommendations for all users, and caches them in Redis.
+    Pass an enabled BatchProfiler to record where the time goes, and
+    with_explanations=True to also pre-compute LLM explanations.
     """
+    profiler = profiler or BatchProfiler(enabled=False)
+    if redis_client is None:
+        connect_redis()
     print("\n--- Starting Batch Recommendation Job ---")
+    job_start = time.perf_counter()
+    profiler.start()
 
     # 1. Load all data from MongoDB into pandas DataFrames
-    products_df, users_df, interactions_df = load_data()
+    with profiler.phase('load_data'):
+        products_df, users_df, interactions_df = load_data()
     if users_df.empty or products_df.empty or interactions_df.empty:
         print("❌ ERROR: Data loading failed or one of the collections is empty. Aborting job.")
         return
+    profiler.count('products', len(products_df))
+    profiler.count('interactions', len(interactions_df))
 
-    # 2. Train the Collaborative Filtering Model on the full dataset
-    train_collaborative_model(interactions_df)
+    # 2. Train the Collaborative Filtering and text-similarity models on the full dataset
+    with profiler.phase('train_collaborative'):
+        train_collaborative_model(interactions_df)
+    with profiler.phase('train_content'):
+        train_content_model(products_df, interactions_df)
     
     all_user_ids = users_df['user_id'].unique()
     print(f"INFO: Found {len(all_user_ids)} users to process.")
+    profiler.count('users', len(all_user_ids))
 
-    # 3. Generate and Cache Recommendations for Each User
-    recommendations_cached = 0
-    for user_id in all_user_ids:
-        # --- Run the hybrid logic by calling our refactored functions ---
-        
-        # Get content-based recommendations (returns a DataFrame)
-        content_recs_df = get_content_based_recommendations(
-            user_id, products_df, interactions_df, top_n=TOP_N_RECOMMENDATIONS
-        )
-        content_rec_ids = list(content_recs_df['product_id'])
-        
-        # Get collaborative filtering recommendations (returns a list of IDs)
-        collab_rec_ids = get_collaborative_filtering_recommendations(
-            user_id=user_id,
-            products_df=products_df,
-            interactions_df=interactions_df,
-            top_n=TOP_N_RECOMMENDATIONS
+    # 3. Rank all users in blocks and cache the results
+    # Candidate generation, score fusion and filters run on whole blocks of users at once
+    with profiler.phase('build_pipeline'):
+        pipeline = RankingPipeline(
+            products_df, interactions_df,
+            weights=DEFAULT_WEIGHTS, fusion=RANKING_FUSION,
         )
+    recommendations_cached = 0
+    for start in range(0, len(all_user_ids), USER_BLOCK_SIZE):
+        block_user_ids = all_user_ids[start:start + USER_BLOCK_SIZE]
+        block_start = time.perf_counter()
+        with profiler.phase('scoring'):
+            ranked_block = pipeline.rank(block_user_ids, top_n=TOP_N_RECOMMENDATIONS)
+        profiler.record_block(len(block_user_ids), time.perf_counter() - block_start)
+        # Profile mode only: score a few sampled users again on their own for the per-user latency
+        with profiler.phase('per_user_sample'):
+            for user_id in profiler.sample_users(block_user_ids):
+                user_start = time.perf_counter()
+                pipeline.rank([user_id], top_n=TOP_N_RECOMMENDATIONS)
+                profiler.record_user(time.perf_counter() - user_start)
+
+        block_recs = {}
+        with profiler.phase('redis_write'):
+            redis_pipe = redis_client.pipeline(transaction=False)
+            for user_id, ranked in zip(block_user_ids, ranked_block):
+                block_recs[user_id] = [pid for pid, _ in ranked]
+                # The key is "user:{user_id}:ranked", a sorted set of product_id -> fused score
+                write_ranked(redis_pipe, user_id, ranked)
+                # Drop the plain ID list from older runs or the online fallback; the scored set replaces it
+                redis_pipe.delete(list_key(user_id))
+                if ranked:
+                    recommendations_cached += 1
+            redis_pipe.execute()
+        BATCH_USERS.inc(len(block_user_ids))
+
+        if with_explanations:
+            with profiler.phase('explanations'):
+                profiler.count('explanations_cached', cache_explanations(block_recs, products_df, interactions_df))
+
+    profiler.count('recommendations_cached', recommendations_cached)
+
+    # 4. Publish a new version so API instances drop their in-process response caches
+    recommendations_version = str(time.time_ns())
+    redis_client.set(RECOMMENDATIONS_VERSION_KEY, recommendations_version)
+    print(f"INFO: Published recommendations version {recommendations_version}.")
+    job_seconds = time.perf_counter() - job_start
+    users_per_second = len(all_user_ids) / job_seconds if job_seconds > 0 else 0.0
+    BATCH_DURATION.set(job_seconds)
+    BATCH_THROUGHPUT.set(users_per_second)
+    BATCH_LAST_SUCCESS.set_to_current_time()
+    if BATCH_PUSHGATEWAY_URL:
+        push_batch_metrics(BATCH_PUSHGATEWAY_URL)
 
-        # --- Combine and de-duplicate the IDs ---
-        # Start with content-based, as it's a reliable fallback
-        final_rec_ids = content_rec_ids
-        for pid in collab_rec_ids:
-            if pid not in final_rec_ids:
-                final_rec_ids.append(pid)
-        
-        # Ensure we only store the top N recommendations
-        final_rec_ids = final_rec_ids[:TOP_N_RECOMMENDATIONS]
-
-        if final_rec_ids:
-            # The key is "user:{user_id}:recommendations"
-            redis_key = f"user:{user_id}:recommendations"
-            # The value is a JSON string representation of the list of product IDs
-            redis_client.set(redis_key, json.dumps(final_rec_ids))
-            recommendations_cached += 1
-    
     print(f"\n--- ✅ Batch Job Complete ---")
     print(f"Successfully pre-computed and cached recommendations for {recommendations_cached} users in Redis.")
+    print(f"INFO: Processed {len(all_user_ids)} users in {job_seconds:.2f}s ({users_per_second:.1f} users/s).")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-compute recommendations for all users and cache them in Redis.")
+    parser.add_argument('--explanations', action='store_true',
+                        help="Also pre-compute LLM explanations for each user's top items (batched, several users per prompt).")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record per-phase wall/CPU time, per-block and sampled per-user latency and memory, and write a JSON report.")
+    parser.add_argument('--profile-output', default='batch_profile.json',
+                        help="Path of the JSON profiling report (default: batch_profile.json).")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="With --profile, also run cProfile and include the hottest functions in the report.")
+    parser.add_argument('--cprofile-output', default=None,
+                        help="With --cprofile, also dump raw cProfile stats here (viewable with snakeviz/pstats).")
+    return parser.parse_args()
 
 # --- Main Execution Block ---
 if __name__ == "__main__":
-    run_batch_recommendation_job()
\ No newline at end of file
+    args = parse_args()
+    if BATCH_METRICS_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(int(BATCH_METRICS_PORT), registry=BATCH_REGISTRY)
+        print(f"INFO: Serving batch metrics on port {BATCH_METRICS_PORT}.")
+
+    profiler = BatchProfiler(enabled=args.profile, use_cprofile=args.cprofile)
+    run_batch_recommendation_job(profiler, with_explanations=args.explanations)
+    if args.profile:
+        report = profiler.write_report(args.profile_output, cprofile_path=args.cprofile_output)
+        print(f"INFO: Profiling report written to {args.profile_output}")
+        for name, phase in report['phases'].items():
+            print(f"  {name:<20} wall={phase['wall_seconds']:.3f}s cpu={phase['cpu_seconds']:.3f}s")
@@ -0,0 +1,153 @@
+# benchmarks/cold_start.py
+
+"""
+Measures API cold-start time in fresh interpreters:
+  - import time of the main modules
+  - time from process start until /health/live succeeds and /health/ready
+    reports the data as loaded (whether or not Redis is reachable)
+
+Usage:
+    python benchmarks/cold_start.py                  # run and compare with the saved baseline
+    python benchmarks/cold_start.py --save-baseline  # run and store the result as the new baseline
+
+Time-to-ready uses whatever data source is configured (the local snapshot if
+one exists, otherwise MongoDB), so run it with the same setup each time.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'results', 'cold_start.json')
+BASELINE_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'cold_start.json')
+IMPORT_MODULES = ['app.data_loader', 'app.recommender', 'app.ranking', 'app.main']
+READY_TIMEOUT_SECONDS = 120
+REGRESSION_TOLERANCE = 0.20  # Flag results more than 20% slower than the baseline
+
+IMPORT_CHILD = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+STARTUP_CHILD = """
+import json, time
+start = time.perf_counter()
+import app.main as main
+imported = time.perf_counter() - start
+from fastapi.testclient import TestClient
+
+with TestClient(main.app) as client:
+    live = None
+    while live is None:
+        if client.get('/health/live').status_code == 200:
+            live = time.perf_counter() - start
+    while True:
+        response = client.get('/health/ready')
+        state = response.json()
+        # Time to ready measures the data warm-up, so do not wait on Redis here
+        if state['status'] in ('ready', 'failed') or time.perf_counter() - start > {timeout}:
+            break
+        time.sleep(0.005)
+    ready = time.perf_counter() - start
+
+print(json.dumps({{
+    'import_seconds': imported,
+    'live_seconds': live,
+    'ready_seconds': ready if state['status'] == 'ready' else None,
+    'status': state['status'],
+    'data_source': state['data_source'],
+}}))
+"""
+
+
+def _run_child(code: str) -> str:
+    env = {**os.environ, 'PYTHONPATH': ROOT_DIR}
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    # The app prints INFO logs; the measurement is always the last line
+    return result.stdout.strip().splitlines()[-1]
+
+
+def _summary(samples: list) -> dict:
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return None
+    return {
+        'median_ms': statistics.median(samples) * 1000,
+        'min_ms': min(samples) * 1000,
+        'max_ms': max(samples) * 1000,
+        'runs': len(samples),
+    }
+
+
+def run_benchmark(repeats: int) -> dict:
+    imports = {}
+    for module in IMPORT_MODULES:
+        imports[module] = _summary([float(_run_child(IMPORT_CHILD.format(module=module))) for _ in range(repeats)])
+        print(f"INFO: import {module:<18} median {imports[module]['median_ms']:.1f} ms")
+
+    runs = [json.loads(_run_child(STARTUP_CHILD.format(timeout=READY_TIMEOUT_SECONDS))) for _ in range(repeats)]
+    startup = {
+        'live': _summary([r['live_seconds'] for r in runs]),
+        'ready': _summary([r['ready_seconds'] for r in runs]),
+        'final_status': runs[-1]['status'],
+        'data_source': runs[-1]['data_source'],
+    }
+    print(f"INFO: time to live   median {startup['live']['median_ms']:.1f} ms")
+    if startup['ready']:
+        print(f"INFO: time to ready  median {startup['ready']['median_ms']:.1f} ms (data from {startup['data_source']})")
+    else:
+        print(f"WARN: service never became ready (status: {startup['final_status']})")
+    return {'python': sys.version.split()[0], 'repeats': repeats, 'imports': imports, 'startup': startup}
+
+
+def compare_with_baseline(results: dict, baseline: dict) -> list:
+    """Returns a list of human-readable regressions (empty if none)."""
+    pairs = [(f"import {m}", results['imports'].get(m), baseline['imports'].get(m)) for m in IMPORT_MODULES]
+    pairs += [(f"time to {k}", results['startup'].get(k), baseline['startup'].get(k)) for k in ('live', 'ready')]
+    regressions = []
+    for name, current, previous in pairs:
+        if not current or not previous:
+            continue
+        change = current['median_ms'] / previous['median_ms'] - 1
+        print(f"  {name:<28} {previous['median_ms']:>9.1f} -> {current['median_ms']:>9.1f} ms ({change:+.0%})")
+        if change > REGRESSION_TOLERANCE:
+            regressions.append(f"{name} is {change:.0%} slower than the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API cold-start time.")
+    parser.add_argument('--repeats', type=int, default=5, help="Fresh processes per measurement (default: 5).")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeats)
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Baseline saved to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            regressions = compare_with_baseline(results, json.load(f))
+        if regressions:
+            print("❌ Cold-start regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("✅ No cold-start regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# benchmarks/load_test.py
+
+"""
+End-to-end load test for the recommender API.
+
+Starts `uvicorn benchmarks.load_test_app:app` (the API wired to fakeredis or a
+local redis-server, a synthetic data snapshot and a fake Gemini client), drives
+it at a fixed concurrency, and reports RPS, p50/p95/p99 latency and error rate
+per endpoint. Results are saved to benchmarks/results/load_test.json and
+compared with benchmarks/baselines/load_test.json when one exists.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 32 --duration 30
+    python benchmarks/load_test.py --llm-latency-ms 800 --llm-error-rate 0.05
+    python benchmarks/load_test.py --redis-url redis://localhost:6379/15
+    python benchmarks/load_test.py --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'results', 'load_test.json')
+BASELINE_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'load_test.json')
+READY_TIMEOUT_SECONDS = 120
+# Regression thresholds against the baseline
+LATENCY_TOLERANCE = 0.25      # p95/p99 more than 25% slower
+THROUGHPUT_TOLERANCE = 0.20   # RPS more than 20% lower
+ERROR_RATE_TOLERANCE = 0.01   # error rate more than 1 point higher
+
+# Endpoint mix: name -> (weight, path template)
+ENDPOINTS = {
+    'recommendations': (0.7, "/recommendations/{user_id}?top_n=5"),
+    'stream': (0.2, "/recommendations/{user_id}/stream?top_n=5"),
+    'ready': (0.1, "/health/ready"),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'PYTHONPATH': ROOT_DIR,
+        'LOADTEST_USERS': str(args.users),
+        'LOADTEST_PRODUCTS': str(args.products),
+        'LOADTEST_INTERACTIONS': str(args.interactions),
+        'LOADTEST_MISS_RATE': str(args.miss_rate),
+        'LOADTEST_LLM_LATENCY_MS': str(args.llm_latency_ms),
+        'LOADTEST_LLM_ERROR_RATE': str(args.llm_error_rate),
+    }
+    if args.redis_url:
+        env['LOADTEST_REDIS_URL'] = args.redis_url
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'benchmarks.load_test_app:app',
+         '--host', '127.0.0.1', '--port', str(port), '--no-access-log'],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL if args.quiet else None,
+    )
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen):
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"FATAL ERROR: Load-test server exited with code {server.returncode}.")
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    sys.exit("FATAL ERROR: Load-test server did not become ready in time.")
+
+
+def pick_user(rng: random.Random, n_users: int, hot_share: float) -> str:
+    """A `hot_share` of requests go to 1% of users (kiosk/default IDs, retrying clients)."""
+    hot_users = max(1, n_users // 100)
+    index = rng.randrange(hot_users) if rng.random() < hot_share else rng.randrange(n_users)
+    return f"U{index:05d}"
+
+
+async def _request(client: httpx.AsyncClient, path: str, streaming: bool):
+    """Returns (status_code, seconds). For streams, times the full body."""
+    start = time.perf_counter()
+    if streaming:
+        async with client.stream('GET', path) as response:
+            body = b"".join([chunk async for chunk in response.aiter_bytes()])
+            if response.status_code == 200 and b"event: error" in body:
+                return 599, time.perf_counter() - start  # Stream reported a failure mid-way
+    else:
+        response = await client.get(path)
+    return response.status_code, time.perf_counter() - start
+
+
+async def drive_load(base_url: str, args) -> dict:
+    names = list(ENDPOINTS)
+    weights = [ENDPOINTS[n][0] for n in names]
+    samples = {name: [] for name in names}  # name -> list of (status, seconds)
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        async def worker(worker_id: int):
+            rng = random.Random(args.seed + worker_id)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights=weights)[0]
+                path = ENDPOINTS[name][1].format(user_id=pick_user(rng, args.users, args.hot_share))
+                try:
+                    samples[name].append(await _request(client, path, streaming=(name == 'stream')))
+                except httpx.HTTPError:
+                    samples[name].append((0, args.timeout))
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return summarize(samples, elapsed)
+
+
+def _endpoint_summary(results: list, elapsed: float) -> dict:
+    if not results:
+        return {'requests': 0}
+    statuses = np.array([status for status, _ in results])
+    latencies = np.array([seconds for _, seconds in results]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': int(len(results)),
+        'rps': len(results) / elapsed,
+        'error_rate': float(np.mean((statuses == 0) | (statuses >= 500))),
+        'status_counts': {str(code): int(count) for code, count in zip(*np.unique(statuses, return_counts=True))},
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(latencies.max()),
+    }
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    endpoints = {name: _endpoint_summary(results, elapsed) for name, results in samples.items()}
+    endpoints['all'] = _endpoint_summary([r for results in samples.values() for r in results], elapsed)
+    return {'duration_seconds': elapsed, 'endpoints': endpoints}
+
+
+def print_report(results: dict):
+    print(f"\n{'endpoint':<16}{'requests':>9}{'rps':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, s in results['endpoints'].items():
+        if not s['requests']:
+            continue
+        print(f"{name:<16}{s['requests']:>9}{s['rps']:>9.1f}{s['error_rate']:>8.1%}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+
+def compare_with_baseline(results: dict, baseline: dict) -> list:
+    """Returns a list of human-readable regressions (empty if none)."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if not previous or not previous.get('requests') or not current.get('requests'):
+            continue
+        for metric in ('p95_ms', 'p99_ms'):
+            if current[metric] > previous[metric] * (1 + LATENCY_TOLERANCE):
+                regressions.append(f"{name} {metric}: {previous[metric]:.1f} -> {current[metric]:.1f}")
+        if current['rps'] < previous['rps'] * (1 - THROUGHPUT_TOLERANCE):
+            regressions.append(f"{name} rps: {previous['rps']:.1f} -> {current['rps']:.1f}")
+        if current['error_rate'] > previous['error_rate'] + ERROR_RATE_TOLERANCE:
+            regressions.append(f"{name} error rate: {previous['error_rate']:.1%} -> {current['error_rate']:.1%}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the recommender API against local stand-ins.")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent client connections (default: 16).")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds of load to generate (default: 20).")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds (default: 30).")
+    parser.add_argument('--users', type=int, default=2000, help="Synthetic users (default: 2000).")
+    parser.add_argument('--products', type=int, default=500, help="Synthetic products (default: 500).")
+    parser.add_argument('--interactions', type=int, default=50000, help="Synthetic interactions (default: 50000).")
+    parser.add_argument('--miss-rate', type=float, default=0.1,
+                        help="Share of users without batch recommendations, served by the online fallback (default: 0.1).")
+    parser.add_argument('--hot-share', type=float, default=0.3,
+                        help="Share of requests that go to the hottest 1%% of users (default: 0.3).")
+    parser.add_argument('--llm-latency-ms', type=float, default=300, help="Fake Gemini latency per call (default: 300).")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help="Fake Gemini error rate, 0-1 (default: 0).")
+    parser.add_argument('--redis-url', default=None,
+                        help="Use a local redis-server (its database is flushed) instead of fakeredis.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the request mix (default: 42).")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline.")
+    parser.add_argument('--quiet', action='store_true', help="Hide the server's own log output.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(args, port)
+    try:
+        wait_until_ready(base_url, server)
+        print(f"INFO: Driving {base_url} with {args.concurrency} connections for {args.duration:.0f}s...")
+        results = asyncio.run(drive_load(base_url, args))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()  # Graceful shutdown can hang on lingering keep-alive connections
+
+    results['config'] = {k: v for k, v in vars(args).items() if k not in ('save_baseline', 'quiet')}
+    print_report(results)
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nINFO: Baseline saved to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print("\nWARN: Baseline was recorded with a different configuration; comparison may be misleading.")
+        regressions = compare_with_baseline(results, baseline)
+        if regressions:
+            print("\n❌ Load-test regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\n✅ No load-test regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
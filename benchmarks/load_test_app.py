@@ -0,0 +1,158 @@
+# benchmarks/load_test_app.py
+
+"""
+The recommender API wired to local stand-ins, for load testing:
+  - data: a synthetic catalogue written to a local snapshot file (no MongoDB)
+  - cache: fakeredis in-process, or a real local redis-server via LOADTEST_REDIS_URL
+  - LLM: a fake Gemini client with configurable latency and error rate
+
+Run by benchmarks/load_test.py as `uvicorn benchmarks.load_test_app:app`.
+Configured through LOADTEST_* environment variables (see load_test.py).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+# --- Configuration ---
+NUM_USERS = int(os.getenv("LOADTEST_USERS", "2000"))
+NUM_PRODUCTS = int(os.getenv("LOADTEST_PRODUCTS", "500"))
+NUM_INTERACTIONS = int(os.getenv("LOADTEST_INTERACTIONS", "50000"))
+MISS_RATE = float(os.getenv("LOADTEST_MISS_RATE", "0.1"))  # Share of users with no batch recommendations
+LLM_LATENCY_MS = float(os.getenv("LOADTEST_LLM_LATENCY_MS", "300"))
+LLM_ERROR_RATE = float(os.getenv("LOADTEST_LLM_ERROR_RATE", "0.0"))
+REDIS_URL = os.getenv("LOADTEST_REDIS_URL")  # Unset: use fakeredis
+SEED = int(os.getenv("LOADTEST_SEED", "42"))
+CATEGORIES = ['Electronics', 'Book', 'Apparel', 'Homeware', 'Tool', 'Health', 'Toy']
+
+
+def generate_data(seed: int = SEED):
+    """Builds a deterministic synthetic catalogue with a few bestsellers."""
+    rng = random.Random(seed)
+    products_df = pd.DataFrame([{
+        'product_id': f"P{i:05d}",
+        'name': f"Product {i}",
+        'category': rng.choice(CATEGORIES),
+        'price': round(rng.uniform(5, 500), 2),
+        'description': f"A high-quality product from our {rng.choice(CATEGORIES)} collection.",
+    } for i in range(NUM_PRODUCTS)])
+    users_df = pd.DataFrame([{'user_id': f"U{i:05d}", 'name': f"User {i}"} for i in range(NUM_USERS)])
+
+    bestsellers = products_df['product_id'].sample(n=max(1, NUM_PRODUCTS // 20), random_state=seed).tolist()
+    start = datetime(2025, 1, 1)
+    interactions_df = pd.DataFrame([{
+        'interaction_id': i,
+        'user_id': f"U{rng.randrange(NUM_USERS):05d}",
+        'product_id': rng.choice(bestsellers) if rng.random() < 0.3 else f"P{rng.randrange(NUM_PRODUCTS):05d}",
+        'type': rng.choices(['view', 'add_to_cart', 'purchase'], weights=[6, 2, 2])[0],
+        'timestamp': start + timedelta(minutes=i),
+    } for i in range(NUM_INTERACTIONS)])
+    return products_df, users_df, interactions_df
+
+
+class FakeGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGemini:
+    """Stand-in for the google-genai client: sleeps, then answers (or fails) like Gemini would."""
+    def __init__(self, latency_ms: float, error_rate: float, seed: int = SEED):
+        self.models = self
+        self.latency_seconds = latency_ms / 1000
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.latency_seconds)
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise RuntimeError("Fake Gemini error")
+        if config and config.get('response_mime_type') == 'application/json':
+            # Answer every user/product pair listed in the batched prompt
+            entries, user_id = [], None
+            for line in contents.splitlines():
+                line = line.strip()
+                if line.startswith('User ') and line.endswith(':'):
+                    user_id = line[len('User '):-1]
+                elif line.startswith('- product_id: '):
+                    product_id = line[len('- product_id: '):].split('.', 1)[0]
+                    entries.append({'user_id': user_id, 'product_id': product_id,
+                                    'explanation': f"Since you enjoy similar items, you will love {product_id}."})
+            return FakeGeminiResponse(json.dumps({'explanations': entries}))
+        return FakeGeminiResponse("Since you enjoy similar items, you will love this one.")
+
+
+def seed_redis(client, products_df, interactions_df, users_df):
+    """Writes batch-style recommendations for all but MISS_RATE of the users."""
+    from app.ranking import RankingPipeline
+    from app.response_cache import RECOMMENDATIONS_VERSION_KEY
+    from app.recommendation_store import RANKED_DEPTH, write_ranked
+
+    rng = random.Random(SEED)
+    covered = [uid for uid in users_df['user_id'] if rng.random() >= MISS_RATE]
+    pipeline = RankingPipeline(products_df, interactions_df, weights={'category': 0.6, 'popularity': 0.4})
+    redis_pipe = client.pipeline(transaction=False)
+    for start in range(0, len(covered), 256):
+        block = covered[start:start + 256]
+        for user_id, ranked in zip(block, pipeline.rank(block, top_n=RANKED_DEPTH)):
+            write_ranked(redis_pipe, user_id, ranked)
+    redis_pipe.set(RECOMMENDATIONS_VERSION_KEY, str(time.time_ns()))
+    redis_pipe.execute()
+    print(f"INFO: Seeded recommendations for {len(covered)}/{len(users_df)} users.")
+
+
+def _make_redis_client():
+    import redis
+    if REDIS_URL:
+        client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        client.flushdb()  # The load test owns this database
+        return client
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("FATAL ERROR: fakeredis is not installed. `pip install fakeredis` or set LOADTEST_REDIS_URL.")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+# --- Wire the app to the stand-ins ---
+_products_df, _users_df, _interactions_df = generate_data()
+_snapshot_dir = tempfile.mkdtemp(prefix='recommender-loadtest-')
+os.environ['DATA_SNAPSHOT_PATH'] = os.path.join(_snapshot_dir, 'data_snapshot.pkl')
+os.environ['MDB_URI'] = ''  # Never touch a real MongoDB, even if .env configures one
+
+from app import data_loader, recommender  # noqa: E402  (environment must be set first)
+data_loader.save_snapshot(_products_df, _users_df, _interactions_df, path=os.environ['DATA_SNAPSHOT_PATH'])
+recommender.set_genai_client(FakeGemini(LLM_LATENCY_MS, LLM_ERROR_RATE))
+
+import app.main as main  # noqa: E402
+
+_redis_client = _make_redis_client()
+seed_redis(_redis_client, _products_df, _interactions_df, _users_df)
+
+
+def _connect_stand_in_redis():
+    main.redis_client = _redis_client
+
+
+def _load_stand_in_data():
+    # Replaces the MongoDB refresh that follows the snapshot load
+    return _products_df, _users_df, _interactions_df
+
+
+main.connect_redis = _connect_stand_in_redis
+main.load_data = _load_stand_in_data
+app = main.app
+USER_IDS = _users_df['user_id'].tolist()